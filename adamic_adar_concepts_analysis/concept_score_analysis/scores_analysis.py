@@ -2,8 +2,40 @@ import matplotlib.pyplot as plt
 import numpy as np
 import matplotlib.cm as cm
 import matplotlib.colors as mcolors
-from collections import defaultdict
 import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from oqi_common import incidence
+
+
+def concept_average_scores_by_year(papers_csv, concepts_to_track):
+    """
+    {concept_id: {année: score moyen du concept dans les articles de l'année}} pour les
+    concepts suivis, calculé sur le store d'incidence (oqi_common/incidence.py) au lieu
+    de redécouper la colonne concepts ligne par ligne.
+    """
+    papers = incidence.load_incidence(papers_csv)
+    years = pd.read_csv(papers_csv, usecols=["publication_year"], dtype=str,
+                        keep_default_na=False)["publication_year"]
+    rows = np.flatnonzero(years.str.isdigit().to_numpy())
+
+    positions, owners = incidence.token_positions(papers, rows)
+    concepts = papers.indices[positions]
+    keep = incidence.concept_mask(papers, concepts_to_track)[concepts] & ~np.isnan(papers.scores[positions])
+    tokens = pd.DataFrame({
+        "concept_id": papers.concept_ids[concepts[keep]],
+        "year": years.to_numpy()[rows[owners[keep]]].astype(int),
+        "score": papers.scores[positions[keep]].astype(float),
+    })
+
+    # concepts dans l'ordre de leur première apparition, années triées
+    means = tokens.groupby(["concept_id", "year"], sort=False)["score"].mean()
+    concept_avg_scores = {}
+    for (concept_id, year), score in means.items():
+        concept_avg_scores.setdefault(concept_id, {})[year] = score
+    return concept_avg_scores
 
 
 def get_top_adamic_scores(csv_file, top_n):
@@ -40,39 +72,8 @@ def plot_individual_concept_scores(top_year=1965, top_n=10):
 
     print(f"Tracking {len(concepts_to_track)} unique concepts from top {top_n} pairs of {top_year}")
 
-    # Étape 2 : Regrouper les scores par concept et par année
-    concept_scores_by_year = defaultdict(lambda: defaultdict(list))
-
-    with open("quantum_subtree.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            year = row.get("publication_year")
-            if not year or not year.isdigit():
-                continue
-            year = int(year)
-
-            concepts_str = row.get("concepts", "")
-            for concept_entry in concepts_str.split(";"):
-                if "|" not in concept_entry:
-                    continue
-                try:
-                    concept_uri, name, score_str = concept_entry.strip().split("|")
-                    concept_id = concept_uri.split("/")[-1]
-                    score = float(score_str)
-                except Exception:
-                    continue
-
-                if concept_id in concepts_to_track:
-                    concept_scores_by_year[concept_id][year].append(score)
-
-    # Étape 3 : Calcul des moyennes par année
-    concept_avg_scores = {
-        concept_id: {
-            year: np.nanmean(scores) if scores else np.nan
-            for year, scores in year_scores.items()
-        }
-        for concept_id, year_scores in concept_scores_by_year.items()
-    }
+    # Étapes 2 et 3 : scores moyens par concept et par année
+    concept_avg_scores = concept_average_scores_by_year("quantum_subtree.csv", concepts_to_track)
 
     # Étape 4 : Tracer les courbes
     all_years = sorted({year for scores in concept_avg_scores.values() for year in scores})
@@ -104,7 +105,6 @@ import os
 import matplotlib.pyplot as plt
 import numpy as np
 import csv
-from collections import defaultdict
 import matplotlib.cm as cm
 import re
 
@@ -125,39 +125,8 @@ def plot_and_save_concept_score_evolution(top_year=1965, top_n=10, output_dir="c
 
     print(f"Tracking {len(concepts_to_track)} unique concepts from top {top_n} pairs of {top_year}")
 
-    # Étape 2 : Récupérer les scores annuels
-    concept_scores_by_year = defaultdict(lambda: defaultdict(list))
-
-    with open("quantum_subtree.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            year = row.get("publication_year")
-            if not year or not year.isdigit():
-                continue
-            year = int(year)
-
-            concepts_str = row.get("concepts", "")
-            for concept_entry in concepts_str.split(";"):
-                if "|" not in concept_entry:
-                    continue
-                try:
-                    concept_uri, name, score_str = concept_entry.strip().split("|")
-                    concept_id = concept_uri.split("/")[-1]
-                    score = float(score_str)
-                except Exception:
-                    continue
-
-                if concept_id in concepts_to_track:
-                    concept_scores_by_year[concept_id][year].append(score)
-
-    # Étape 3 : Calcul des moyennes
-    concept_avg_scores = {
-        concept_id: {
-            year: np.nanmean(scores) if scores else np.nan
-            for year, scores in year_scores.items()
-        }
-        for concept_id, year_scores in concept_scores_by_year.items()
-    }
+    # Étapes 2 et 3 : scores moyens par concept et par année
+    concept_avg_scores = concept_average_scores_by_year("quantum_subtree.csv", concepts_to_track)
 
     # Étape 4 : Création du dossier de sortie
     os.makedirs(output_dir, exist_ok=True)
@@ -1,227 +1,145 @@
 import csv 
+import glob
 import os
-import requests
+import sys
 import networkx as nx
-from networkx.algorithms.link_prediction import adamic_adar_index
-from tqdm import tqdm
 import matplotlib.pyplot as plt
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from oqi_common import score_store
+from oqi_common import pair_tracking
+from oqi_common import concept_cache
+from oqi_common import incidence
+from oqi_common import levels as concept_levels
+from oqi_common import period_scoring
+from oqi_common import periods as period_ids
 
 
-def get_season_label(date):
+# Périodes (oqi_common/periods.py) : un identifiant entier par période, calculé directement
+# depuis publication_date. QUARTER donne les saisons "winter_2020", ...; MONTH, YEAR ou
+# Periods(1, window=6) (fenêtres glissantes de 6 mois) fonctionnent de la même façon.
 
-    year = date.year
-    month = date.month
-    if month in [1, 2, 3]:
-        season = 'winter'
-    elif month in [4, 5, 6]:
-        season = 'spring'
-    elif month in [7, 8, 9]:
-        season = 'summer'
-    else:
-        season = 'fall'
-    return f"{season}_{year}"
-
-
-
-def generate_adamic_adar_scores_levels(levels):
-
-    output_dir = f"adamic_scores_levels_{'_'.join(levels)}"
-    os.makedirs(output_dir, exist_ok=True)
-
-    allowed_concepts = set()
-    with open('concepts_levels.csv', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for ligne in reader:
-            if str(ligne["level"]) in levels:
-                concept_id = ligne["concept_id"].split("/")[-1]
-                allowed_concepts.add(concept_id)
-
-    # Lecture du dataset principal
-    df = pd.read_csv("quantum_networks_log_papers.csv")
-    df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
-    df = df.dropna(subset=['publication_date'])
-    df['season_label'] = df['publication_date'].apply(get_season_label)
-
-    season_order = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4}
-    df['season'] = df['season_label'].str.extract(r'(\w+)_\d+')[0]
-    df['year'] = df['season_label'].str.extract(r'_(\d+)')[0].astype(int)
-    df['season_rank'] = df['season'].map(season_order)
-    grouped = df.groupby(['year', 'season_rank', 'season_label'])['paper_id'].apply(list)
-    grouped = grouped.sort_index()
-
-    cumulative_articles = set()
-    season_articles_cumulative = {}
-
-    for (_, _, label), paper_ids in grouped.items():
-        cumulative_articles.update(paper_ids)
-        season_articles_cumulative[label] = sorted(cumulative_articles)
-
-    # Charger les données d’articles
-    with open("quantum_networks_log_papers.csv", newline='', encoding='utf-8') as fichier_csv:
-        lecteur = csv.DictReader(fichier_csv)
-        article_data = {ligne['paper_id']: ligne for ligne in lecteur}
-
-    for season, list_article in list(season_articles_cumulative.items()):
-        G = nx.Graph()
-
-        for article_id in list_article:
-            article = article_data.get(article_id)
-            if not article:
-                continue
-
-            concept_all = article.get("concepts", "").split(";")
-            concept_sliced = [i.split("|") for i in concept_all if len(i.split("|")) == 2]
-
-            # Appliquer le filtre de niveau ici
-            concept_ids_filtered = [
-                item[0].split('/')[-1]
-                for item in concept_sliced
-                if item[0].split('/')[-1] in allowed_concepts
-            ]
-
-            # Ajouter les noeuds filtrés
-            for item in concept_sliced:
-                concept_id = item[0].split('/')[-1]
-                concept_name = item[1]
-                concept_link = item[0]
-                if concept_id in allowed_concepts and concept_id not in G:
-                    G.add_node(concept_id, Concept_name=concept_name, Concept_link=concept_link)
-                    print(f"🧠 Concept ajouté : ID={concept_id}, Nom={concept_name}, Niveau={levels}")
-
-            # Ajouter les arêtes filtrées
-            for i in range(len(concept_ids_filtered)):
-                for j in range(i + 1, len(concept_ids_filtered)):
-                    concept1 = concept_ids_filtered[i]
-                    concept2 = concept_ids_filtered[j]
-                    if not G.has_edge(concept1, concept2):
-                        G.add_edge(concept1, concept2)
-
-        # Générer les non-arêtes
-        non_edges_list = list(nx.non_edges(G))
-        print(f"🔍 {season}: {len(non_edges_list)} couples non connectés")
-
-        # Calculer les scores Adamic-Adar
-        adamic_preds = list(adamic_adar_index(G, tqdm(non_edges_list)))
-
-
-        output_path = os.path.join(output_dir, f"{season}_adamic_scores.csv")
-        with open(output_path, mode='w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Concept1", "Concept2", "AdamicAdarScore"])
-            for u, v, score in adamic_preds:
-                writer.writerow([u, v, score])
-        print(f"✅ Fichier sauvegardé : {output_path}")    
-
-# Example of use 
-# generate_adamic_adar_scores_levels(["4","5"])
-
-
-def generate_adamic_adar_scores_all_levels():
+def snapshot_papers(dates_csv, periods):
 
-    # Creation du quaterly Dict 
+    # [(label, articles du graphe de la période)], dans l'ordre chronologique
 
-    df = pd.read_csv("quantum_networks_subtree_papers_dates.csv")
+    df = pd.read_csv(dates_csv, usecols=['paper_id', 'publication_date'], dtype={'paper_id': str})
     df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
     df = df.dropna(subset=['publication_date'])
 
-    df['season_label'] = df['publication_date'].apply(get_season_label)
+    return [(periods.label(period_id), paper_ids)
+            for period_id, paper_ids in period_ids.snapshot_papers(df['paper_id'], df['publication_date'], periods)]
 
-    season_order = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4}
-    df['season'] = df['season_label'].str.extract(r'(\w+)_\d+')[0]
-    df['year'] = df['season_label'].str.extract(r'_(\d+)')[0].astype(int)
-    df['season_rank'] = df['season'].map(season_order)
 
-    grouped = df.groupby(['year', 'season_rank', 'season_label'])['paper_id'].apply(list)
-    grouped = grouped.sort_index()
+def score_jobs(csv_path, jobs, workers, periods, deltas_dir=None, **options):
 
-    cumulative_articles = set()
-    season_articles_cumulative = {}
-
-    for (_, _, label), paper_ids in grouped.items():
-        cumulative_articles.update(paper_ids)
-        season_articles_cumulative[label] = sorted(cumulative_articles) 
-
-    '''for season, ids in season_articles_cumulative.items():
-        print(f"{season}: {ids}")'''
+    # Fenêtre glissante sur un seul processus, ou fichiers delta demandés : le graphe est mis à
+    # jour d'une période à l'autre au lieu d'être reconstruit ; sinon un graphe par période
+    # (en parallèle si workers > 1)
 
+    if deltas_dir or (periods.window is not None and workers == 1):
+        return period_scoring.score_sliding_periods(csv_path, jobs, deltas_dir=deltas_dir, **options)
+    return period_scoring.score_periods(csv_path, jobs, workers, **options)
 
-    with open("quantum_networks_log_papers.csv", newline='', encoding='utf-8') as fichier_csv:
-        lecteur = csv.DictReader(fichier_csv)
-        article_data = {ligne['paper_id']: ligne for ligne in lecteur}
 
+def generate_adamic_adar_scores_levels(levels, top_k=None, min_score=None, store_dir=None, workers=1,
+                                       periods=period_ids.QUARTER, deltas_dir=None):
+    """
+    Scores Adamic-Adar du graphe cumulatif des concepts des niveaux `levels`, par saison.
 
-    for season, list_article in list(season_articles_cumulative.items()):  # un graphe par saison
+    top_k     : si donné, ne garde que les top_k paires au score le plus élevé par saison.
+    min_score : si donné, ne garde que les paires de score >= min_score
+                (min_score > 0 écarte les paires de score nul sans les énumérer).
+    store_dir : si donné, les scores de chaque saison sont aussi écrits dans le store
+                Parquet partitionné par période (voir oqi_common/score_store.py).
+    workers   : nombre de processus qui calculent les saisons en parallèle (None = tous
+                les cœurs), voir oqi_common/period_scoring.py.
+    periods   : découpage temporel (oqi_common/periods.py), par défaut les saisons
+                (QUARTER) ; MONTH pour une dynamique mensuelle, Periods(1, window=6)
+                pour des fenêtres glissantes. Les fichiers sont nommés par le label de la période.
+                Avec une fenêtre et workers=1, un seul graphe glisse d'une période à l'autre
+                (articles entrants ajoutés, sortants retirés, voir oqi_common/sliding_graph.py).
+    deltas_dir: si donné, écrit aussi pour chaque période <saison>_adamic_delta.csv : les paires
+                ajoutées, retirées ou dont le score a changé depuis la période précédente,
+                calculées sur les seuls nœuds touchés (un seul processus, workers est ignoré).
+    """
 
-        G = nx.Graph()
-
-        concepts_list = []
-
-        for article_id in list_article:
-
-            article = article_data.get(article_id)
-
-            print(article_id)
-
-            concept_all = article.get("concepts").split(";")
+    output_dir = f"adamic_scores_levels_{'_'.join(levels)}"
+    if periods.window is not None:
+        output_dir += f"_window{periods.window}"
+    os.makedirs(output_dir, exist_ok=True)
 
-            concept_sliced = [i.split("|") for i in concept_all] # gets all the individual concepts 
+    # Articles du graphe de chaque période (cumulatif, ou fenêtre glissante)
+    season_articles_cumulative = snapshot_papers("quantum_networks_log_papers.csv", periods)
 
-            for item in concept_sliced:
+    # Concepts des articles déjà découpés (oqi_common/incidence.py), relus depuis le cache .npy
+    papers = incidence.load_incidence("quantum_networks_log_papers.csv")
+    # Filtre de niveau : masque vectorisé sur les bitmasks de niveaux (oqi_common/levels.py)
+    allowed_mask = concept_levels.level_mask(
+        concept_levels.incidence_level_bits(papers, "concepts_levels.csv"), levels)
 
-                concept_link = item[0]  
-                concept_name = item[1]  
-                concept_id = item[0].split('/')[-1]
+    # Une tâche par saison : graphe cumulatif, scores Adamic-Adar (matrice creuse), CSV écrit atomiquement
+    jobs = [(season, incidence.paper_rows(papers, list_article),
+             os.path.join(output_dir, f"{season}_adamic_scores.csv"))
+            for season, list_article in season_articles_cumulative]
 
-                if concept_id not in G:
+    for season, n_concepts, n_pairs in score_jobs(
+            "quantum_networks_log_papers.csv", jobs, workers, periods, deltas_dir, mask=allowed_mask,
+            top_k=top_k, min_score=min_score, store_dir=store_dir):
+        print(f"🧠 {season}: {n_concepts} concepts de niveau {levels}")
+        print(f"🔍 {season}: {n_pairs} couples non connectés retenus")
+        print(f"✅ Fichier sauvegardé : {os.path.join(output_dir, f'{season}_adamic_scores.csv')}")
 
-                    G.add_node(concept_id, Concept_name=concept_name, Concept_link=concept_link) # add the concept in the graph (node)
+# Example of use 
+# generate_adamic_adar_scores_levels(["4","5"])
+# generate_adamic_adar_scores_levels(["4","5"], top_k=5000)  # only the 5000 best pairs per season
 
-            for i in range(len(concept_sliced)): # here we connect all the concept together based on their appearance in each article
-                for j in range(i + 1, len(concept_sliced)): 
-                    concept1 = concept_sliced[i][0].split('/')[-1]
-                    concept2 = concept_sliced[j][0].split('/')[-1]
-                    if not G.has_edge(concept1, concept2): 
-                        G.add_edge(concept1, concept2)
 
-        # print(G.edges)
+def generate_adamic_adar_scores_all_levels(top_k=None, min_score=None, store_dir=None, workers=1,
+                                           periods=period_ids.QUARTER, deltas_dir=None):
 
-        non_edges_list = list(nx.non_edges(G)) # non-connected nodes
+    # Creation du quaterly Dict (une entrée par période, voir oqi_common/periods.py)
 
-        print("Aperçu des couples de nœuds non connectés :")
-        for u, v in non_edges_list[:10]:
-            print(f"{u} - {v}")
+    season_articles_cumulative = snapshot_papers("quantum_networks_subtree_papers_dates.csv", periods)
 
-        adamic_preds = list(adamic_adar_index(G, tqdm(non_edges_list))) # calculates adamic adar index for each pair of non-connected nodes
+    '''for season, ids in season_articles_cumulative:
+        print(f"{season}: {ids}")'''
 
-        filename = f"{season}_adamic_scores.csv"
 
-        with open(filename, mode='w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Concept1", "Concept2", "AdamicAdarScore"])  # en-têtes
+    papers = incidence.load_incidence("quantum_networks_log_papers.csv")
 
-            for u, v, score in adamic_preds:
+    # one job per season (un graphe par saison): all the concepts of the articles, connected when
+    # they appear in a same article, then the adamic adar index of each pair of non-connected nodes.
+    # With workers > 1 the seasons are computed in parallel (see oqi_common/period_scoring.py)
+    # With deltas_dir, <season>_adamic_delta.csv files (pairs added / removed / changed since the
+    # previous season) are written there too, e.g. for temporal_analysis(deltas_dir=...)
+    # With a sliding window (periods.window) the files go to adamic_scores_window_<n>/
+    output_dir = "." if periods.window is None else f"adamic_scores_window_{periods.window}"
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(season, incidence.paper_rows(papers, list_article),
+             os.path.join(output_dir, f"{season}_adamic_scores.csv"))
+            for season, list_article in season_articles_cumulative]
 
-                writer.writerow([u, v, score])
+    for season, n_concepts, n_pairs in score_jobs(
+            "quantum_networks_log_papers.csv", jobs, workers, periods, deltas_dir,
+            top_k=top_k, min_score=min_score, store_dir=store_dir):
+        print(f"{season}: {n_concepts} concepts, {n_pairs} couples non connectés")
 
 
-# Function we call to put the name of the concepts in the graph
+# Noms lisibles des concepts : cache persistant (oqi_common/concept_cache.py), initialisé
+# avec les noms déjà présents dans le CSV des articles, puis requêtes groupées par 50
 
-def get_display_name(concept_id):
+def get_concept_names(concept_ids):
 
-    url = f'https://api.openalex.org/concepts/{concept_id}'
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('display_name', concept_id)
-        else:
-            return concept_id
-    except:
-        return concept_id
+    # chaque fichier n'est utilisé que s'il est présent dans le dossier courant
+    if os.path.exists("concepts_levels.csv"):
+        concept_cache.seed_from_levels_csv("concepts_levels.csv")
+    if os.path.exists("quantum_networks_log_papers.csv"):
+        concept_cache.seed_from_papers_csv("quantum_networks_log_papers.csv")
+    return concept_cache.display_names(concept_ids)
 
     
 def visualiser_top_adamic_from_file(fichier_csv, top_n):
@@ -240,7 +158,7 @@ def visualiser_top_adamic_from_file(fichier_csv, top_n):
 
     # Récupération des noms lisibles (display_name)
     all_concepts = set([u for u, _, _ in top_edges] + [v for _, v, _ in top_edges])
-    concept_names = {cid: get_display_name(cid) for cid in tqdm(all_concepts, desc="Fetching concept names")}
+    concept_names = get_concept_names(all_concepts)
 
     G = nx.Graph()
     for u, v, score in top_edges:
@@ -286,123 +204,130 @@ def get_top_adamic_scores(csv_file, top_n):
     return top_scores
 
 
-# Get the temporal evolution of the AA score over the seasons and years
-
-def temporal_analysis():
-
-    missing_data = [] # files (seasons) missing in the articles subset 
-
-    season_order = ['winter', 'spring', 'summer', 'fall']
-
-    previous_concepts = set() 
-
-    # DYNAMIC : TRACKED PAIR TOP 10 ADAMIC SCORES 
+def get_top_adamic_scores_from_store(store_dir, season, top_n):
 
-    tracked_pairs = set()
-    pair_scores = {}
-    first_season_track = 0
-    seasons_graph_x = []
-
-    # Define the years scope (first available : 1984)
-
-    for year in range(2010, 2024):  # 2024 not included
-
-        for season in season_order:
+    # Same output as get_top_adamic_scores, reading only the season's partition of the store
 
-            missing_tracked_concepts = []
+    top = score_store.top_scores(store_dir, season, top_n)
 
-            subfolder = f"adamic_scores_all_level"
-            filename = os.path.join(subfolder, f"{season}_{year}_adamic_scores.csv")
+    return [(row.Concept1, row.Concept2, float(row.AdamicAdarScore)) for row in top.itertuples(index=False)]
 
-            if os.path.exists(filename):
 
-                first_season_track += 1
-
-                if first_season_track == 1: # we take the concepts to track in the first available file 
+# Get the temporal evolution of the AA score over the seasons and years
+# Each season file is read once, by chunks: only the scores of the tracked pairs and the
+# 64-bit hashes of the season's pairs are kept (see oqi_common/pair_tracking.py),
+# so track_amount can go up to thousands of pairs with bounded memory.
+# store_dir : read the scores from the Parquet store instead of the CSV files
+# deltas_dir : only read the first season in full, then the delta files written by the
+#              generators (generate_adamic_adar_scores_all_levels(min_score=..., deltas_dir=...)):
+#              the tracked scores and the added / removed / common counts come from the deltas
 
-                    track_amount = 20
+def temporal_analysis(store_dir=None, track_amount=20, periods=period_ids.QUARTER, deltas_dir=None):
 
-                    top_concepts_scores = get_top_adamic_scores(filename, track_amount)
+    missing_data = [] # files (seasons) missing in the articles subset 
 
-                    tracked_pairs = {
-                        tuple(sorted((concept1, concept2)))
-                        for concept1, concept2, _ in top_concepts_scores
-                    }
+    seasons_graph_x = []
 
-                    pair_scores = {pair: [] for pair in tracked_pairs}
+    store_periods = set(score_store.list_periods(store_dir)) if store_dir else set()
 
-                seasons_graph_x.append(f"{season}_{year}")
+    subfolder = f"adamic_scores_all_level"
 
-                current_scores = {}
+    # Define the years scope (first available : 1984): every period from 2010 to 2023
 
-                current_concepts = set()
+    available_seasons = []
 
-                print(f"Traitement fichier {filename}")
+    for period_id in periods.period_range(period_ids.year_start(periods, 2010),
+                                          period_ids.year_start(periods, 2024) - 1):  # 2024 not included
 
-                with open(filename, newline='', encoding='utf-8') as csvfile:
+        season = periods.label(period_id)
 
-                    reader = csv.DictReader(csvfile)
-                    
-                    # get ALL concepts
-                    
-                    for i, row in enumerate(reader):
+        filename = os.path.join(subfolder, f"{season}_adamic_scores.csv")
 
-                        concept1 = row["Concept1"]
-                        concept2 = row["Concept2"]
-                        score = float(row["AdamicAdarScore"])
+        available = season in store_periods if store_dir else os.path.exists(filename)
 
-                        pair = tuple(sorted((concept1, concept2))) # pour tous 
+        if available:
+            available_seasons.append(season)
+        else:
+            missing_data.append(filename)
 
-                        current_scores[pair] = score # dict with the pair of concept and their Adamic score 
+    if not available_seasons:
+        print("Aucun fichier de scores trouvé.")
+        return
 
-                        current_concepts.add(pair) # concepts of the current season 
+    # DYNAMIC : TRACKED PAIR TOP ADAMIC SCORES, taken in the first available season
 
-                # get SUBSET concepts
+    first_season = available_seasons[0]
 
-                for pair in tracked_pairs:
+    if store_dir:
+        top_concepts_scores = get_top_adamic_scores_from_store(store_dir, first_season, track_amount)
+    else:
+        top_concepts_scores = get_top_adamic_scores(os.path.join(subfolder, f"{first_season}_adamic_scores.csv"), track_amount)
 
-                    if pair in current_scores:
+    tracked_pairs = sorted({
+        tuple(sorted((concept1, concept2)))
+        for concept1, concept2, _ in top_concepts_scores
+    })
 
-                        pair_scores[pair].append(current_scores[pair]) # add the score of the current season to the list of scores of the tracked pair
+    pair_scores = {pair: [] for pair in tracked_pairs}
 
-                    else:
+    def season_sources():
+        for season in available_seasons:
+            if store_dir:
+                yield season, pair_tracking.store_chunks(store_dir, season)
+            else:
+                yield season, pair_tracking.csv_chunks(os.path.join(subfolder, f"{season}_adamic_scores.csv"))
+
+    def delta_sources():
+        # every delta after the first season and before 2024, in period order
+        # (seasons without papers have none)
+        start = periods.parse_label(first_season)
+        stop = period_ids.year_start(periods, 2024)
+        deltas = {}
+        for filename in glob.glob(os.path.join(deltas_dir, "*_adamic_delta.csv")):
+            period_id = periods.parse_label(os.path.basename(filename)[:-len("_adamic_delta.csv")])
+            if period_id is not None and start < period_id < stop:
+                deltas[period_id] = filename
+        for period_id in sorted(deltas):
+            yield periods.label(period_id), pair_tracking.delta_chunks(deltas[period_id])
+
+    if deltas_dir:
+        first = next(season_sources())
+        summaries = pair_tracking.track_deltas(first, delta_sources(), tracked_pairs)
+    else:
+        summaries = pair_tracking.track_periods(season_sources(), tracked_pairs)
 
-                        pair_scores[pair].append(float("nan")) # the pair of concepts disapeared
+    for summary in summaries:
 
-                        missing_tracked_concepts.append(pair)
+        print(f"Traitement période {summary.period}")
 
-                # Comparaison 
+        seasons_graph_x.append(summary.period)
 
-                if previous_concepts:
+        missing_tracked_concepts = []
 
-                    common = current_concepts & previous_concepts
-                    added = current_concepts - previous_concepts
-                    removed = previous_concepts - current_concepts # pairs of concepts that diseappeared from the previous season to the current one
+        for pair, score in zip(tracked_pairs, summary.tracked_scores):
 
-                    print(f"Comparaison avec la saison précédente :")
-                    print(f"   ➕ Nouveaux liens : {len(added)}")
-                    print(f"   ➖ Liens disparus : {len(removed)}")
-                    print(f"   ✅ Liens communs  : {len(common)}")
+            pair_scores[pair].append(score) # NaN when the pair of concepts disappeared
 
-                previous_concepts = current_concepts
+            if np.isnan(score):
+                missing_tracked_concepts.append(pair)
 
-            else:
+        # Comparaison 
 
-                missing_data.append(filename)
+        if summary.has_previous:
 
+            print(f"Comparaison avec la saison précédente :")
+            print(f"   ➕ Nouveaux liens : {summary.added}")
+            print(f"   ➖ Liens disparus : {summary.removed}")
+            print(f"   ✅ Liens communs  : {summary.common}")
 
-            print(f"Missing pairs in {season} : {missing_tracked_concepts}")
+        print(f"Missing pairs in {summary.period} : {missing_tracked_concepts}")
 
 # Print the missing seasons
 # print(missing_data)
 
 # Visualisation des données 
 
-    concept_names = {}
-    for pair in pair_scores:
-        for concept_id in pair:
-            if concept_id not in concept_names:
-                concept_names[concept_id] = get_display_name(concept_id)
+    concept_names = get_concept_names({concept_id for pair in pair_scores for concept_id in pair})
 
     plt.figure(figsize=(12, 6))
 
@@ -417,7 +342,7 @@ def temporal_analysis():
     plt.xticks(rotation=45)
     plt.xlabel("Saison")
     plt.ylabel("Adamic-Adar Score")
-    plt.title(f"Évolution du score Adamic-Adar pour 20 paires de concepts")
+    plt.title(f"Évolution du score Adamic-Adar pour {track_amount} paires de concepts")
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
@@ -1,27 +1,51 @@
 import csv 
 import os
+import sys
 import networkx as nx
-from networkx.algorithms.link_prediction import adamic_adar_index
-from tqdm import tqdm
 import matplotlib.pyplot as plt
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from oqi_common.adamic_sparse import adamic_adar_index_sparse
+from oqi_common import score_store
+from oqi_common import pair_tracking
+from oqi_common import incidence
+from oqi_common import levels as concept_levels
+from oqi_common import period_scoring
+
 
 # ------- YEARLY AND LEVELS 4 TO 5 ------------------------
 
-def generate_adamic_adar_scores_by_year():
+def generate_adamic_adar_scores_by_year(incremental=True, top_k=None, min_score=None, store_dir=None,
+                                        workers=1, window=None):
+    """
+    Calcule les scores Adamic-Adar du graphe cumulatif des concepts pour chaque année.
+
+    incremental : si True, un seul graphe est conservé d'une année à l'autre et seuls
+                  les articles de la nouvelle année y sont ajoutés (une seule passe sur
+                  les articles). Si False, le graphe est reconstruit depuis zéro à partir
+                  de tous les articles cumulés pour chaque année.
+    top_k       : si donné, ne garde que les top_k paires au score le plus élevé par année.
+    min_score   : si donné, ne garde que les paires de score >= min_score
+                  (min_score > 0 écarte les paires de score nul sans les énumérer).
+    Sans ces options, toutes les paires non connectées sont écrites, comme avant.
+    store_dir   : si donné, les scores de chaque année sont aussi écrits dans le store
+                  Parquet partitionné par période (voir oqi_common/score_store.py).
+    workers     : nombre de processus (None = tous les cœurs). Au-delà de 1, les années sont
+                  calculées en parallèle, chacune sur son graphe cumulatif complet
+                  (voir oqi_common/period_scoring.py) : incremental est alors ignoré.
+    window      : si donné, graphe des seuls articles des `window` dernières années (fenêtre
+                  glissante) au lieu du graphe cumulatif ; les scores vont dans
+                  adamic_scores_by_year_window<n>/. Avec workers=1 le graphe glisse d'une année
+                  à l'autre (voir oqi_common/sliding_graph.py).
+    """
     output_dir = "adamic_scores_by_year"
+    if window is not None:
+        output_dir += f"_window{window}"
     os.makedirs(output_dir, exist_ok=True)
 
-    # Lire les niveaux des concepts
-    levels_df = pd.read_csv("concepts_levels.csv")
-    levels_df['concept_id'] = levels_df['concept_id'].str.strip()  # au cas où il y a des espaces
-    allowed_concepts = set(
-        levels_df[levels_df['level'].isin([4, 5])]['concept_id'].apply(lambda x: x.split("/")[-1])
-    )
-
     # Chargement des données
     df = pd.read_csv("quantum_subtree.csv")
     df = df.dropna(subset=['publication_year'])
@@ -29,73 +53,78 @@ def generate_adamic_adar_scores_by_year():
 
     grouped = df.groupby('publication_year')['paper_id'].apply(list).sort_index()
 
+    # Concepts des articles déjà découpés (oqi_common/incidence.py), relus depuis le cache .npy
+    papers = incidence.load_incidence("quantum_subtree.csv")
+    # Concepts de niveau 4 ou 5 : masque vectorisé sur les bitmasks de niveaux (oqi_common/levels.py)
+    allowed_mask = concept_levels.level_mask(
+        concept_levels.incidence_level_bits(papers, "concepts_levels.csv"), [4, 5])
+
+    if window is not None:
+        jobs = []
+        for year in grouped.index:
+            in_window = grouped[(grouped.index > year - window) & (grouped.index <= year)]
+            window_articles = sorted({paper_id for paper_ids in in_window for paper_id in paper_ids})
+            jobs.append((year, incidence.paper_rows(papers, window_articles),
+                         os.path.join(output_dir, f"{year}_adamic_scores.csv")))
+
+        if workers == 1:
+            results = period_scoring.score_sliding_periods(
+                "quantum_subtree.csv", jobs, mask=allowed_mask, with_names=True,
+                top_k=top_k, min_score=min_score, store_dir=store_dir)
+        else:
+            results = period_scoring.score_periods(
+                "quantum_subtree.csv", jobs, workers, mask=allowed_mask, with_names=True,
+                top_k=top_k, min_score=min_score, store_dir=store_dir)
+        for year, n_concepts, n_pairs in results:
+            print(f"Nombre de paires non connectées retenues pour {year} "
+                  f"(fenêtre de {window} ans): {n_pairs} ({n_concepts} concepts)")
+        print("Fin de l’analyse par année.")
+        return
+
+    if workers is None or workers > 1:
+        jobs = []
+        cumulative_articles = set()
+        for year, paper_ids in grouped.items():
+            cumulative_articles.update(paper_ids)
+            jobs.append((year, incidence.paper_rows(papers, sorted(cumulative_articles)),
+                         os.path.join(output_dir, f"{year}_adamic_scores.csv")))
+
+        for year, n_concepts, n_pairs in period_scoring.score_periods(
+                "quantum_subtree.csv", jobs, workers, mask=allowed_mask, with_names=True,
+                top_k=top_k, min_score=min_score, store_dir=store_dir):
+            print(f"Nombre de paires non connectées retenues pour {year}: {n_pairs} "
+                  f"({n_concepts} concepts)")
+        print("Fin de l’analyse par année.")
+        return
+
+    G = nx.Graph()
     cumulative_articles = set()
-    year_articles_cumulative = {}
 
     for year, paper_ids in grouped.items():
-        cumulative_articles.update(paper_ids)
-        year_articles_cumulative[year] = sorted(cumulative_articles)
-
-    # Lecture complète du CSV en dictionnaire
-    with open("quantum_subtree.csv", newline='', encoding='utf-8') as fichier_csv:
-        lecteur = csv.DictReader(fichier_csv)
-        article_data = {ligne['paper_id']: ligne for ligne in lecteur}
-
-    for year, list_article in year_articles_cumulative.items():
-        G = nx.Graph()
-        print(f"Processing year: {year} with {len(list_article)} articles.")
-
-        for article_id in list_article:
-            article = article_data.get(article_id)
-            if not article or not article.get("concepts"):
-                continue
-
-            try:
-                concept_all = article["concepts"].split(";")
-            except Exception as e:
-                print(f"Erreur pour article {article_id}: {e}")
-                continue
-
-            concept_sliced = [
-                i.split("|") for i in concept_all
-                if "|" in i and i.split("|")[0].split("/")[-1] in allowed_concepts
-            ]
-
-            # Ajout des noeuds filtrés
-            for item in concept_sliced:
-                concept_link = item[0]
-                concept_name = item[1]
-                concept_id = concept_link.split('/')[-1]
-
-                if concept_id not in G:
-                    G.add_node(concept_id, Concept_name=concept_name, Concept_link=concept_link)
-
-            # Connexion des concepts
-            for i in range(len(concept_sliced)):
-                for j in range(i + 1, len(concept_sliced)):
-                    concept1 = concept_sliced[i][0].split('/')[-1]
-                    concept2 = concept_sliced[j][0].split('/')[-1]
-                    if not G.has_edge(concept1, concept2):
-                        G.add_edge(concept1, concept2)
-
-        # Calcul Adamic-Adar
-        non_edges_list = list(nx.non_edges(G))
-        print(f"Nombre de paires non connectées à évaluer pour {year}: {len(non_edges_list)}")
-
-        adamic_preds = list(adamic_adar_index(G, tqdm(non_edges_list)))
+        new_articles = set(paper_ids) - cumulative_articles
+        cumulative_articles.update(new_articles)
+
+        if incremental:
+            # Le graphe de l'année précédente est conservé, on n'ajoute que les nouveaux articles
+            incidence.add_papers_to_graph(G, papers, incidence.paper_rows(papers, sorted(new_articles)),
+                                          allowed_mask)
+        else:
+            G = nx.Graph()
+            incidence.add_papers_to_graph(G, papers, incidence.paper_rows(papers, sorted(cumulative_articles)),
+                                          allowed_mask)
+
+        print(f"Processing year: {year} with {len(cumulative_articles)} articles "
+              f"({len(new_articles)} new).")
+
+        # Calcul Adamic-Adar (matrice creuse, toutes les paires non connectées d'un coup)
+        adamic_preds = adamic_adar_index_sparse(G, top_k=top_k, min_score=min_score)
+        print(f"Nombre de paires non connectées retenues pour {year}: {len(adamic_preds)}")
 
         output_path = os.path.join(output_dir, f"{year}_adamic_scores.csv")
-        with open(output_path, mode='w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Concept1_ID", "Concept1_Name",
-                "Concept2_ID", "Concept2_Name",
-                "AdamicAdarScore"
-            ])
-            for u, v, score in adamic_preds:
-                name_u = G.nodes[u].get('Concept_name', 'Unknown')
-                name_v = G.nodes[v].get('Concept_name', 'Unknown')
-                writer.writerow([u, name_u, v, name_v, score])
+        period_scoring.write_scores_csv(output_path, G, adamic_preds, with_names=True)
+
+        if store_dir:
+            period_scoring.write_scores_to_store(store_dir, year, G, adamic_preds)
 
     print("Fin de l’analyse par année.")
 
@@ -169,76 +198,93 @@ def get_top_adamic_scores(csv_file, top_n):
     return top_scores
 
 
-def temporal_analysis():
+def get_top_adamic_scores_from_store(store_dir, year, top_n):
+    """
+    Même résultat que get_top_adamic_scores, lu depuis le store Parquet
+    (seule la partition de l'année est ouverte).
+    """
+    top = score_store.top_scores(store_dir, str(year), top_n)
+    return [
+        ((row.Concept1, row.Concept1_Name), (row.Concept2, row.Concept2_Name), float(row.AdamicAdarScore))
+        for row in top.itertuples(index=False)
+    ]
+
+
+def temporal_analysis(store_dir=None, track_amount=10):
+    """
+    Suit l'évolution du score Adamic-Adar des track_amount meilleures paires de la
+    première année disponible, et compte les liens ajoutés / disparus / communs d'une
+    année à l'autre.
+
+    Chaque fichier n'est lu qu'une fois, par morceaux : seuls les scores des paires
+    suivies et les empreintes (hash 64 bits) des paires de l'année sont conservés
+    (voir oqi_common/pair_tracking.py), ce qui permet de suivre des milliers de paires.
+
+    store_dir : si donné, les scores sont lus depuis le store Parquet au lieu des CSV.
+    """
 
-    track_amount = None
     missing_data = []
-    previous_concepts = set()
-    tracked_pairs = set()
     pair_scores = {}
-    first_year_track = 0
     years_graph_x = []
     top_concepts_scores=None
+    store_periods = set(score_store.list_periods(store_dir)) if store_dir else set()
+    subfolder = f"adamic_scores_by_year"  
 
+    available_years = []
     for year in range(1965, 2024): 
-        subfolder = f"adamic_scores_by_year"  
         filename = os.path.join(subfolder, f"{year}_adamic_scores.csv")
-
-        if os.path.exists(filename):
-            first_year_track += 1
-
-            if first_year_track == 1:
-                track_amount = 10
-                top_concepts_scores = get_top_adamic_scores(filename, track_amount)
-                print(f"Top concept scores : ", top_concepts_scores)
-
-                tracked_pairs = {
-                    tuple(sorted(((c1_id, c1_name), (c2_id, c2_name))))
-                    for (c1_id, c1_name), (c2_id, c2_name), _ in top_concepts_scores
-                }
-                pair_scores = {pair: [] for pair in tracked_pairs}
-
-            years_graph_x.append(str(year))
-            current_scores = {}
-            current_concepts = set()
-            missing_tracked_concepts = []
-
-            print(f"Traitement fichier {filename}")
-
-            with open(filename, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-
-                for row in reader:
-                    c1_id, c1_name = row["Concept1_ID"], row["Concept1_Name"]
-                    c2_id, c2_name = row["Concept2_ID"], row["Concept2_Name"]
-                    score = float(row["AdamicAdarScore"])
-                    pair = tuple(sorted(((c1_id, c1_name), (c2_id, c2_name))))
-                    current_scores[pair] = score
-                    current_concepts.add(pair)
-
-            for pair in tracked_pairs:
-                if pair in current_scores:
-                    pair_scores[pair].append(current_scores[pair])
-                else:
-                    pair_scores[pair].append(float("nan"))
-                    missing_tracked_concepts.append(pair)
-
-            if previous_concepts:
-                common = current_concepts & previous_concepts
-                added = current_concepts - previous_concepts
-                removed = previous_concepts - current_concepts
-
-                print(f"Comparaison avec l'année précédente :")
-                print(f"   ➕ Nouveaux liens : {len(added)}")
-                print(f"   ➖ Liens disparus : {len(removed)}")
-                print(f"   ✅ Liens communs  : {len(common)}")
-
-            previous_concepts = current_concepts
-            print(f"Missing pairs in {year} : {missing_tracked_concepts}")
-
+        available = str(year) in store_periods if store_dir else os.path.exists(filename)
+        if available:
+            available_years.append(year)
         else:
             missing_data.append(filename)
 
+    if not available_years:
+        print("Aucun fichier de scores trouvé.")
+        return
+
+    # Les paires suivies sont les meilleures de la première année disponible
+    first_year = available_years[0]
+    if store_dir:
+        top_concepts_scores = get_top_adamic_scores_from_store(store_dir, first_year, track_amount)
+    else:
+        top_concepts_scores = get_top_adamic_scores(
+            os.path.join(subfolder, f"{first_year}_adamic_scores.csv"), track_amount)
+    print(f"Top concept scores : ", top_concepts_scores)
+
+    tracked_pairs = sorted({
+        tuple(sorted(((c1_id, c1_name), (c2_id, c2_name))))
+        for (c1_id, c1_name), (c2_id, c2_name), _ in top_concepts_scores
+    })
+    pair_scores = {pair: [] for pair in tracked_pairs}
+
+    def period_sources():
+        for year in available_years:
+            if store_dir:
+                yield str(year), pair_tracking.store_chunks(store_dir, year)
+            else:
+                yield str(year), pair_tracking.csv_chunks(
+                    os.path.join(subfolder, f"{year}_adamic_scores.csv"))
+
+    tracked_ids = [(c1[0], c2[0]) for c1, c2 in tracked_pairs]
+    for summary in pair_tracking.track_periods(period_sources(), tracked_ids):
+        print(f"Traitement période {summary.period}")
+        years_graph_x.append(summary.period)
+
+        missing_tracked_concepts = []
+        for pair, score in zip(tracked_pairs, summary.tracked_scores):
+            pair_scores[pair].append(score)
+            if np.isnan(score):
+                missing_tracked_concepts.append(pair)
+
+        if summary.has_previous:
+            print(f"Comparaison avec l'année précédente :")
+            print(f"   ➕ Nouveaux liens : {summary.added}")
+            print(f"   ➖ Liens disparus : {summary.removed}")
+            print(f"   ✅ Liens communs  : {summary.common}")
+
+        print(f"Missing pairs in {summary.period} : {missing_tracked_concepts}")
+
     # --- Sauvegarde du plot sans légende ---
     plt.figure(figsize=(12, 6))
     for pair, scores in pair_scores.items():
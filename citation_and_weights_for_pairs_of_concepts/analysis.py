@@ -1,75 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import os, itertools, collections
-import requests
+import os
+import sys
 from tqdm import tqdm
 from sklearn.preprocessing import MultiLabelBinarizer
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import random
 
+import edge_files
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from oqi_common import incidence
+from oqi_common import levels as concept_levels
+
 # Directory for storing results
 root = r"C:/results/"
 os.makedirs(root, exist_ok=True)
 
-def fetch_counts_by_year(openalex_id):
-    """
-    Fetch yearly citation counts for a given OpenAlex work (paper) ID using the OpenAlex API.
-    Returns a list of dictionaries with year and citation count.
-    """
-    url = f"https://api.openalex.org/works/{openalex_id}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        counts = data.get('counts_by_year', [])
-        print(counts)
-        return counts
-    except Exception as e:
-        print(f"Error fetching counts for {openalex_id}: {e}")
-        return []
-
-def mainlog():
+def mainlog(base_url=None, rate=8.0, concurrency=8):
     """
     For each paper in the input CSV, fetches yearly citation counts from OpenAlex
     and adds them as columns ('cited_by_{year}') to the output CSV.
+    The counts are fetched concurrently, 50 papers per request (see openalex_counts.py);
+    base_url (default: the OpenAlex API), rate (requests per second) and concurrency
+    are passed to the fetcher.
     """
+    # imported here: building the edges does not need aiohttp
+    from openalex_counts import OPENALEX_URL, fetch_counts_by_year_many, short_id
+
+    if base_url is None:
+        base_url = OPENALEX_URL
     input_csv = "quantum_networks_papers.csv"
     output_csv = "quantum_networks_papers_cites.csv"
 
     df = pd.read_csv(input_csv)
+    print("Nombre de lignes dans le CSV :", len(df))
 
     years_range = list(range(2013, 2025))
-    # Initialize columns for each year, default 0
+    openalex_ids = df['paper_id'].map(short_id)
+    failed = []
+    counts = fetch_counts_by_year_many(openalex_ids, base_url=base_url, rate=rate,
+                                       concurrency=concurrency, failed=failed)
+    if failed:
+        # works of failed batches are written with 0 citations: keep their IDs to re-fetch them
+        failed_csv = "quantum_networks_papers_cites_failed.csv"
+        pd.DataFrame({"paper_id": failed}).to_csv(failed_csv, index=False)
+        print(f"{len(failed)} papers without counts listed in {failed_csv}")
+
+    # Quick-access dict: (paper, year) -> citation count
+    counts_dict = {(paper, item['year']): item.get('cited_by_count', 0)
+                   for paper, items in counts.items() for item in items}
+
+    # One column per year, 0 when OpenAlex has no count for that year
     for y in years_range:
-        df[f'cited_by_{y}'] = 0
-
-    for index, row in tqdm(df.iterrows(), total=len(df)):
-        print("Nombre de lignes dans le CSV :", len(df))
-        paper_id = row['paper_id']
-        openalex_id = paper_id.split('/')[-1]
-        counts = fetch_counts_by_year(openalex_id)
-
-        # Make a quick-access dict: year -> count object
-        counts_dict = {item['year']: item for item in counts}
-
-        for y in years_range:
-            count_obj = counts_dict.get(y)
-            # Set the citation count for this year
-            if count_obj:
-                df.at[index, f'cited_by_{y}'] = count_obj.get('cited_by_count', 0)
-            else:
-                df.at[index, f'cited_by_{y}'] = 0
+        df[f'cited_by_{y}'] = [counts_dict.get((paper, y), 0) for paper in openalex_ids]
 
     # Save the augmented dataframe
     df.to_csv(output_csv, index=False)
     print(f"Augmented CSV saved as {output_csv}")
 
-def analysis11_with_citations(level_threshold: int = 4):
+def pair_citation_sums(M, cites, rows, cols):
+    """
+    Citation sums of the concept pairs (rows[k], cols[k]), given the paper x concept
+    incidence matrix M and the citations of each paper (one value per row of M).
+    Computed as M.T @ diag(cites) @ M in one sparse product.
+    """
+    S = (M.T @ sp.diags(cites) @ M).tocsr()
+    return np.asarray(S[rows, cols]).ravel()
+
+def histogram_quantile(counts, q):
+    """
+    Quantile q of integer values given as a histogram (counts[v] = number of values v),
+    with the linear interpolation of pandas / numpy quantile, so it is exact.
+    """
+    cumulative = np.cumsum(counts)
+    n = cumulative[-1]
+    h = (n - 1) * q
+    lo = int(np.floor(h))
+    v_lo = np.searchsorted(cumulative, lo + 1)
+    v_hi = np.searchsorted(cumulative, min(lo + 2, n))
+    return v_lo + (h - lo) * (v_hi - v_lo)
+
+def weight_threshold(weights, quantile=0.95, min_weight=None, top_n=None, copies=1):
+    """
+    Smallest weight kept by the edge cut, from the histogram of the integer weights
+    (no sort, no copy of the edge list). Every given criterion must hold:
+        quantile   : weight >= quantile of the weights (0.95 keeps the top 5%)
+        min_weight : weight >= min_weight
+        top_n      : weight >= weight of the top_n-th heaviest edge (ties are kept);
+                     top_n <= 0 keeps no edge
+    copies : number of times each edge counts in the quantile; 2 gives the cut of
+             the former edge files, which listed every pair in both directions.
+    """
+    counts = np.bincount(weights)
+    threshold = 0
+    if quantile is not None:
+        threshold = max(threshold, int(np.ceil(histogram_quantile(counts * copies, quantile))))
+    if min_weight is not None:
+        threshold = max(threshold, int(np.ceil(min_weight)))
+    if top_n is not None and top_n <= 0:
+        # above the heaviest weight: no edge is kept
+        threshold = max(threshold, len(counts))
+    elif top_n is not None and top_n < len(weights):
+        heavier = np.cumsum(counts[::-1])  # heavier[k] = number of weights >= len(counts) - 1 - k
+        threshold = max(threshold, len(counts) - 1 - int(np.searchsorted(heavier, top_n)))
+    return threshold
+
+def surviving_entries(C, threshold):
+    """
+    (rows, cols, weights) of the stored entries of the CSR / CSC matrix C with
+    weight >= threshold, in storage order (the order of C.tocoo()).
+    """
+    kept = np.flatnonzero(C.data >= threshold)
+    major = np.searchsorted(C.indptr, kept, side="right") - 1
+    minor = C.indices[kept]
+    if C.format == "csc":
+        return minor, major, C.data[kept]
+    return major, minor, C.data[kept]
+
+def analysis11_with_citations(level_threshold: int = 4, write_csv: bool = False,
+                              quantile: float = 0.95, min_weight=None, top_n=None):
     """
     Main analysis function. Builds yearly concept–co-occurrence edge lists for papers,
     keeping only concepts with OpenAlex level >= `level_threshold`.
     Adds citation columns to each edge file:
         - citation_sum_year: citations in year Y
         - citation_sum_year2: citations in years Y and Y+1
+    Edges are saved as raw_graph1/edges_{year}.npz with integer concept codes into
+    raw_graph1/vocabulary.csv (see edge_files.py); write_csv also writes the former
+    edges_{year}.csv with the concept names.
+    Only the heaviest edges of each year are kept (see weight_threshold): by default
+    weight >= 95th percentile; quantile, min_weight and top_n set the cut.
     """
 
     ROOT = r"C:/results/"
@@ -78,48 +141,38 @@ def analysis11_with_citations(level_threshold: int = 4):
 
     # 1. Load input tables
     data = pd.read_csv("quantum_networks_papers_cites.csv")
-    levels = pd.read_csv("concepts_levels.csv")  # columns: concept_id, level
-
-    # Keep only concept_ids with level ≥ threshold
-    allowed_ids = set(levels.loc[levels["level"] >= level_threshold, "concept_id"])
 
     # Restrict to years of interest
     data = data[(data.publication_year >= 2013) & (data.publication_year < 2025)]
     data = data.drop(columns=['title', 'journal', 'authors'])  # Drop unused columns
 
-    # 2. Parse the 'concepts' column into a list of (id, name, score) tuples
-    def parse_concepts(concept_str):
-        """
-        Parses the 'concepts' string from the input CSV into a list of tuples.
-        Each tuple: (concept_id, concept_name, score)
-        """
-        concepts = []
-        for part in concept_str.split(';'):
-            items = part.split('|')
-            if len(items) == 3:
-                c_id, c_name, c_score = items
-                concepts.append((c_id, c_name, float(c_score)))
-            else:
-                raise ValueError(f"Unexpected format in concept string: {part}")
-        return concepts
-
-    data["parsed_concepts"] = data["concepts"].apply(parse_concepts)
-    df = data.drop(columns="concepts")
-
-    # Convert from wide to long format: one row per (paper, concept)
-    long_df = df.explode("parsed_concepts").reset_index(drop=True)
-    long_df[["concept_id", "concept", "score"]] = pd.DataFrame(
-        long_df["parsed_concepts"].tolist(), index=long_df.index
-    )
-
-    # Keep only paper-concept relations with score > 0 and allowed concept ids
+    # 2. One row per (paper, concept), read from the pre-parsed incidence store of the CSV
+    #    (oqi_common/incidence.py): row i of the store is row i of the CSV, i.e. data.index
+    store = incidence.load_incidence("quantum_networks_papers_cites.csv")
+    positions, owners = incidence.token_positions(store, data.index.to_numpy())
+
+    # Keep only concepts with level ≥ threshold (bitmask per concept, see oqi_common/levels.py;
+    # concepts_levels.csv columns: concept_id, level)
+    allowed = concept_levels.level_mask(
+        concept_levels.incidence_level_bits(store, "concepts_levels.csv"), min_level=level_threshold)
+    keep = allowed[store.indices[positions]]
+    positions, owners = positions[keep], owners[keep]
+    concepts = store.indices[positions]
+    long_df = pd.DataFrame({
+        "paper_id": data["paper_id"].to_numpy()[owners],
+        "publication_year": data["publication_year"].to_numpy()[owners],
+        "concept_id": store.concept_links[concepts],
+        "concept": store.concept_names[concepts],
+        "score": store.scores[positions],
+    })
+
+    # Keep only paper-concept relations with score > 0
     long_df = (
         long_df[["paper_id", "publication_year", "concept_id", "concept", "score"]]
         .query("score > 0.0")
         .drop_duplicates()
         .reset_index(drop=True)
     )
-    long_df = long_df[long_df["concept_id"].isin(allowed_ids)].reset_index(drop=True)
 
     # Save the filtered table
     long_df.to_csv(Path(ROOT, "concepts_long1.csv"), index=False)
@@ -142,87 +195,84 @@ def analysis11_with_citations(level_threshold: int = 4):
         .reset_index(name="concept_list")
     )
 
-    # 4. Build a lookup table for citations: (paper_id, year) -> number of citations
-    citation_lookup = {}
-    for col in data.columns:
-        if col.startswith("cited_by_"):
-            year = int(col.replace("cited_by_", ""))
-            for i, row in data.iterrows():
-                citation_lookup[(row["paper_id"], year)] = row[col]
+    # 4. Citation panel: one row per paper, one column per cited_by_YYYY year
+    cite_cols = [col for col in data.columns if col.startswith("cited_by_")]
+    year_column = {int(col.replace("cited_by_", "")): j for j, col in enumerate(cite_cols)}
+    papers = data.drop_duplicates("paper_id", keep="last")
+    paper_index = pd.Index(papers["paper_id"])
+    citation_panel = papers[cite_cols].to_numpy(dtype=float)
+
+    def paper_citations(rows, year):
+        """Citations in `year` of the papers at `rows` of the panel (0 if the year is not fetched)."""
+        j = year_column.get(year)
+        if j is None:
+            return np.zeros(len(rows))
+        return citation_panel[rows, j]
 
     # 5. Build yearly concept co-occurrence edge lists
+    # Shared vocabulary of the cleaned concept names: the edge files store codes into it
+    # (see edge_files.py)
+    vocabulary = np.unique(df["concept"].to_numpy(dtype=str)).astype(object)
+    edge_files.write_vocabulary(EDGE_DIR, vocabulary)
+
     def yearly_edge_list(bags_year, year):
         """
-        Builds the undirected co-occurrence edge list for a year.
-        Each edge is (source concept, target concept, weight), where weight is number of co-occurrences.
+        Builds the undirected co-occurrence edge list for a year, as columns, keeping only
+        the edges that pass the weight cut. Each pair appears once (source < target).
+        Each edge is (source code, target code, weight), where weight is number of co-occurrences.
         Also adds citation sums for the given year and year+1.
         """
         mlb = MultiLabelBinarizer(sparse_output=True)
         M = mlb.fit_transform(bags_year["concept_list"])
-        concepts = mlb.classes_
+        codes = np.searchsorted(vocabulary, mlb.classes_)  # column of M -> code in the vocabulary
 
-        # Compute co-occurrence matrix
-        C = (M.T @ M)
-        C.setdiag(0)
+        # Compute co-occurrence matrix, upper triangle only: one edge per pair, source < target
+        # (the columns of M follow the sorted vocabulary)
+        C = sp.triu(M.T @ M, k=1, format="csr")
         C.eliminate_zeros()
 
-        coo = C.tocoo()
-        edges = pd.DataFrame({
-            "source": concepts[coo.row],
-            "target": concepts[coo.col],
-            "weight": coo.data
-        })
-
-        # For each concept pair, sum citations of papers where they co-occur
-        paper_year = bags_year.set_index("paper_id")
-        paper_ids = paper_year.index.unique()
-
-        pair2cites1 = collections.defaultdict(float)  # Citations in year Y
-        pair2cites2 = collections.defaultdict(float)  # Citations in years Y and Y+1
-
-        for pid in paper_ids:
-            concept_list = paper_year.loc[pid]["concept_list"]
-            if isinstance(concept_list, list):
-                concepts = sorted(set(concept_list))
-            else:
-                # If it's a Series of one list
-                concepts = sorted(set(concept_list.iloc[0]))
-
-            c1c2_pairs = itertools.combinations(concepts, 2)
-
-            cites_y1 = citation_lookup.get((pid, year), 0)
-            cites_y2 = cites_y1 + citation_lookup.get((pid, year + 1), 0)
-
-            for c1, c2 in c1c2_pairs:
-                key = tuple(sorted((c1, c2)))
-                pair2cites1[key] += cites_y1
-                pair2cites2[key] += cites_y2
-
-        # Add citation sums to edge DataFrame
-        edges["citation_sum_year"] = [
-            pair2cites1.get(tuple(sorted((s, t))), 0.0)
-            for s, t in zip(edges["source"], edges["target"])
-        ]
-        edges["citation_sum_year2"] = [
-            pair2cites2.get(tuple(sorted((s, t))), 0.0)
-            for s, t in zip(edges["source"], edges["target"])
-        ]
-
-        return edges
-
-    # For each year, build the edge list and save as CSV
-    for year, bags_year in tqdm(paper_bags.groupby("publication_year"),
-                                total=paper_bags["publication_year"].nunique(),
-                                desc="Building enriched yearly edges"):
-        edges = yearly_edge_list(bags_year, year)
-
-        if not edges.empty:
-            # Keep only top 5% most frequent edges
-            qcut = edges["weight"].quantile(0.95)
-            edges = edges[edges["weight"] >= qcut]
-
-        edges.to_csv(EDGE_DIR / f"edges_{year}.csv", index=False)
-        print(f"✅ {year}: {len(edges):,} edges saved with citations")
+        # Weight cut from the histogram of C.data: only the surviving entries are extracted.
+        # copies=2 keeps the quantile of the former files, where each pair appeared twice
+        if C.nnz:
+            threshold = weight_threshold(C.data, quantile, min_weight, top_n, copies=2)
+        else:
+            threshold = 0
+        edge_rows, edge_cols, weights = surviving_entries(C, threshold)
+
+        # For each concept pair, sum citations of papers where they co-occur:
+        # (M.T @ diag(cites) @ M)[i, j] = sum of cites over papers containing both i and j
+        rows = paper_index.get_indexer(bags_year["paper_id"])  # rows of M -> rows of the panel
+        cites_y1 = paper_citations(rows, year)  # Citations in year Y
+        cites_y2 = cites_y1 + paper_citations(rows, year + 1)  # Citations in years Y and Y+1
+
+        return {
+            "source": codes[edge_rows],
+            "target": codes[edge_cols],
+            "weight": weights,
+            "citation_sum_year": pair_citation_sums(M, cites_y1, edge_rows, edge_cols),
+            "citation_sum_year2": pair_citation_sums(M, cites_y2, edge_rows, edge_cols),
+        }
+
+    def write_year(year, edges):
+        edge_files.write_year_edges(EDGE_DIR, year, edges)
+        if write_csv:
+            edge_files.write_year_csv(EDGE_DIR, year, edges, vocabulary)
+
+    # For each year, build the edge list; the files are written by a background thread
+    # while the next year is computed
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = []
+        for year, bags_year in tqdm(paper_bags.groupby("publication_year"),
+                                    total=paper_bags["publication_year"].nunique(),
+                                    desc="Building enriched yearly edges"):
+            # Keep only the most frequent edges (top 5% by default)
+            edges = yearly_edge_list(bags_year, year)
+
+            pending.append(writer.submit(write_year, year, edges))
+            print(f"✅ {year}: {len(edges['weight']):,} edges saved with citations")
+
+        for future in pending:
+            future.result()  # re-raises a failed write
 
 #mainlog()  # Uncomment to run the data augmentation step first
 analysis11_with_citations()  # Builds co-occurrence graphs
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Fichiers d'arêtes annuels en binaire : codes entiers des concepts + vocabulaire partagé.
+
+Au lieu de répéter les noms des concepts dans les colonnes source / target de
+chaque edges_YYYY.csv, le dossier contient :
+
+    vocabulary.csv   : code, concept (trié, commun à toutes les années)
+    edges_YYYY.npz   : colonnes source, target (int32, codes du vocabulaire),
+                       weight (int32, nombre de co-occurrences),
+                       citation_sum_year, citation_sum_year2 (float64)
+
+Chaque paire n'y figure qu'une fois, avec source < target (triangle supérieur
+de la matrice de co-occurrence) ; les .npz le déclarent avec pairs = "canonical".
+Un fichier sans ce marqueur (ou un ancien edges_YYYY.csv) peut contenir chaque
+paire dans les deux sens : edge_panel.py ne garde alors qu'une des deux lignes.
+
+Les .npz sont écrits dans un fichier temporaire puis renommés, donc un fichier
+d'une année est soit complet soit absent. edge_panel.py les lit directement,
+sans reparser les noms ; export_csv réécrit les edges_YYYY.csv d'origine.
+"""
+from pathlib import Path
+import os
+import re
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+VOCABULARY_FILE = "vocabulary.csv"
+NPZ_PATTERN = re.compile(r"edges_(\d{4})\.npz")
+COLUMNS = ["source", "target", "weight", "citation_sum_year", "citation_sum_year2"]
+CANONICAL = "canonical"  # valeur du marqueur `pairs` : une ligne par paire, source < target
+
+
+def write_vocabulary(edge_dir: Path, concepts) -> None:
+    path = Path(edge_dir, VOCABULARY_FILE)
+    tmp = path.with_name(path.name + ".tmp")
+    pd.DataFrame({"code": np.arange(len(concepts)), "concept": concepts}).to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_vocabulary(edge_dir: Path) -> np.ndarray:
+    """concepts[code] -> nom du concept."""
+    vocabulary = pd.read_csv(Path(edge_dir, VOCABULARY_FILE), keep_default_na=False)
+    return vocabulary.sort_values("code")["concept"].to_numpy(dtype=object)
+
+
+def write_year_edges(edge_dir: Path, year: int, columns: Dict[str, np.ndarray]) -> Path:
+    """Écrit edges_<year>.npz (colonnes COLUMNS, paires canoniques) de façon atomique."""
+    path = Path(edge_dir, f"edges_{year}.npz")
+    tmp = path.with_name(path.name + ".tmp.npz")
+    np.savez(tmp,
+             pairs=np.array(CANONICAL),
+             source=np.asarray(columns["source"], dtype=np.int32),
+             target=np.asarray(columns["target"], dtype=np.int32),
+             weight=np.asarray(columns["weight"], dtype=np.int32),
+             **{col: np.asarray(columns[col], dtype=np.float64) for col in COLUMNS[3:]})
+    os.replace(tmp, path)
+    return path
+
+
+def read_year_edges(path: Path) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {col: data[col] for col in data.files if col in COLUMNS}
+
+
+def is_canonical(path: Path) -> bool:
+    """True si le fichier déclare une seule ligne par paire (marqueur pairs = "canonical")."""
+    with np.load(path, allow_pickle=False) as data:
+        return "pairs" in data.files and str(data["pairs"]) == CANONICAL
+
+
+def year_files(edge_dir: Path) -> Dict[int, Path]:
+    """{année: edges_YYYY.npz} du dossier."""
+    files = {}
+    for f in Path(edge_dir).glob("edges_*.npz"):
+        match = NPZ_PATTERN.fullmatch(f.name)
+        if match:
+            files[int(match.group(1))] = f
+    return dict(sorted(files.items()))
+
+
+def year_edges_frame(columns: Dict[str, np.ndarray], concepts: np.ndarray) -> pd.DataFrame:
+    """Colonnes d'une année -> DataFrame au format des edges_YYYY.csv (noms des concepts)."""
+    frame = pd.DataFrame({col: columns[col] for col in COLUMNS if col in columns})
+    frame["source"] = concepts[frame["source"].to_numpy()]
+    frame["target"] = concepts[frame["target"].to_numpy()]
+    return frame
+
+
+def write_year_csv(edge_dir: Path, year: int, columns: Dict[str, np.ndarray], concepts: np.ndarray) -> Path:
+    path = Path(edge_dir, f"edges_{year}.csv")
+    tmp = path.with_name(path.name + ".tmp")
+    year_edges_frame(columns, concepts).to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def export_csv(edge_dir: Path) -> None:
+    """Réécrit un edges_YYYY.csv (source/target en noms) pour chaque edges_YYYY.npz."""
+    concepts = read_vocabulary(edge_dir)
+    for year, path in year_files(edge_dir).items():
+        write_year_csv(edge_dir, year, read_year_edges(path), concepts)
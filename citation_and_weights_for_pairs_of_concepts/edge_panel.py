@@ -0,0 +1,229 @@
+from pathlib import Path
+import json
+import os
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import edge_files
+
+
+EDGE_PATTERN = re.compile(r"edges_(\d{4})\.csv")
+SERIES_COLUMNS = ["weight", "citation_sum_year"]
+
+# panels déjà chargés dans ce processus, par (dossier, signature)
+_PANEL_CACHE = {}
+
+
+class EdgePanel(NamedTuple):
+    """
+    Toutes les arêtes annuelles dans une seule table.
+
+    edges    : colonnes src, dst (codes int32 des concepts, src < dst), pair (clé int64
+               de la paire canonique), year, weight, citation_sum_year, citation_sum_year2 ;
+               une seule ligne par (pair, year)
+    concepts : vocabulaire trié, concepts[code] -> nom du concept
+    by_pair  : sommes par (pair, year), index trié pour les séries temporelles d'une paire
+    """
+    edges: pd.DataFrame
+    concepts: np.ndarray
+    by_pair: pd.DataFrame
+
+
+def _make_panel(edges: pd.DataFrame, concepts: np.ndarray) -> EdgePanel:
+    by_pair = edges.groupby(["pair", "year"])[SERIES_COLUMNS].sum().sort_index()
+    return EdgePanel(edges, concepts, by_pair)
+
+
+def _edge_dir_files(edge_dir: Path) -> List[Path]:
+    """Fichiers lus pour le panel : edges_YYYY.npz + vocabulaire s'il y en a, sinon edges_YYYY.csv."""
+    npz_files = list(edge_files.year_files(edge_dir).values())
+    if npz_files:
+        return npz_files + [Path(edge_dir, edge_files.VOCABULARY_FILE)]
+    return sorted(Path(edge_dir).glob("edges_*.csv"))
+
+
+def edge_dir_signature(edge_dir: Path) -> List[List]:
+    """(nom, mtime, taille) de chaque fichier d'arêtes : change dès qu'un fichier est réécrit."""
+    signature = []
+    for f in _edge_dir_files(edge_dir):
+        st = f.stat()
+        signature.append([f.name, st.st_mtime_ns, st.st_size])
+    return signature
+
+
+# -------------------------------------------------------------------
+# chargement de tous les edges_YYYY.csv en une fois
+# -------------------------------------------------------------------
+def load_edge_panel(edge_dir: Path,
+                    cache_file: Optional[Path] = None) -> EdgePanel:
+    """
+    Lit tous les fichiers edges_YYYY.csv de edge_dir et canonicalise les paires
+    de façon vectorisée : les noms sont remplacés par leurs codes dans un
+    vocabulaire trié, puis (min, max) des codes donne la paire canonique,
+    identique à tuple(sorted((source, target))). Si le dossier contient des
+    edges_YYYY.npz (edge_files.py), ils sont lus à la place, les codes et le
+    vocabulary.csv trié étant déjà ceux du panel.
+
+    Les anciens fichiers listent chaque paire dans les deux sens, avec les mêmes
+    valeurs : une seule des deux lignes est gardée (au lieu de diviser weight et
+    citation_sum_year par 2). Les .npz marqués pairs = "canonical" n'en ont pas
+    besoin. Les consommateurs n'ont donc plus rien à corriger.
+
+    cache_file : fichier .npz où le panel est conservé entre deux exécutions ; il
+                 n'est réutilisé que si les fichiers d'arêtes n'ont pas changé depuis.
+
+    Dans un même processus, un panel déjà chargé est renvoyé directement
+    tant que les fichiers n'ont pas changé.
+    """
+    signature = edge_dir_signature(edge_dir)
+    memory_key = (str(Path(edge_dir).resolve()), json.dumps(signature))
+    if memory_key in _PANEL_CACHE:
+        return _PANEL_CACHE[memory_key]
+
+    panel = None
+    if cache_file is not None:
+        panel = _read_panel_cache(cache_file, signature)
+    if panel is None:
+        panel = _read_edge_files(edge_dir)
+        if cache_file is not None:
+            _write_panel_cache(cache_file, panel, signature)
+
+    _PANEL_CACHE[memory_key] = panel
+    return panel
+
+
+def _read_edge_files(edge_dir: Path) -> EdgePanel:
+    if edge_files.year_files(edge_dir):
+        return _read_npz_files(edge_dir)
+
+    rows = []
+    for f in sorted(Path(edge_dir).glob("edges_*.csv")):
+        year = int(EDGE_PATTERN.search(f.name).group(1))
+        df = pd.read_csv(f)
+        if df.empty:
+            continue
+        df["year"] = year
+        rows.append(df)
+    big = pd.concat(rows, ignore_index=True)
+
+    n_rows = len(big)
+    codes, concepts = pd.factorize(
+        np.concatenate([big["source"].to_numpy(dtype=object), big["target"].to_numpy(dtype=object)]),
+        sort=True)
+    source, target = codes[:n_rows], codes[n_rows:]
+    src = np.minimum(source, target).astype(np.int32)
+    dst = np.maximum(source, target).astype(np.int32)
+
+    edges = pd.DataFrame({
+        "src": src,
+        "dst": dst,
+        "pair": src.astype(np.int64) * len(concepts) + dst,
+        "year": big["year"].to_numpy(dtype=np.int32),
+        "weight": big["weight"].to_numpy(dtype=float),
+        "citation_sum_year": big["citation_sum_year"].to_numpy(dtype=float),
+    })
+    if "citation_sum_year2" in big.columns:
+        edges["citation_sum_year2"] = big["citation_sum_year2"].to_numpy(dtype=float)
+
+    # les CSV n'ont pas de marqueur : les paires listées dans les deux sens sont dédoublonnées
+    return _make_panel(_drop_mirrored(edges, np.ones(len(edges), dtype=bool)),
+                       np.asarray(concepts, dtype=object))
+
+
+def _read_npz_files(edge_dir: Path) -> EdgePanel:
+    concepts = edge_files.read_vocabulary(edge_dir)
+    years = []
+    for year, path in edge_files.year_files(edge_dir).items():
+        columns = edge_files.read_year_edges(path)
+        columns["year"] = np.full(len(columns["source"]), year, dtype=np.int32)
+        columns["legacy"] = np.full(len(columns["source"]), not edge_files.is_canonical(path))
+        years.append(columns)
+    columns = {col: np.concatenate([y[col] for y in years]) for col in years[0]}
+
+    src = np.minimum(columns["source"], columns["target"]).astype(np.int32)
+    dst = np.maximum(columns["source"], columns["target"]).astype(np.int32)
+    edges = pd.DataFrame({
+        "src": src,
+        "dst": dst,
+        "pair": src.astype(np.int64) * len(concepts) + dst,
+        "year": columns["year"],
+        "weight": columns["weight"].astype(float),
+        "citation_sum_year": columns["citation_sum_year"],
+        "citation_sum_year2": columns["citation_sum_year2"],
+    })
+    return _make_panel(_drop_mirrored(edges, columns["legacy"]), concepts)
+
+
+def _drop_mirrored(edges: pd.DataFrame, legacy: np.ndarray) -> pd.DataFrame:
+    """
+    Garde une ligne par (pair, year) parmi les lignes `legacy`, où chaque paire
+    apparaît dans les deux sens avec les mêmes valeurs.
+    """
+    if not legacy.any():
+        return edges
+    mirrored = legacy & edges.duplicated(["pair", "year"]).to_numpy()
+    return edges[~mirrored].reset_index(drop=True)
+
+
+def _write_panel_cache(cache_file: Path, panel: EdgePanel, signature):
+    cache_file = Path(cache_file)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    meta = json.dumps({"signature": signature, "pairs": edge_files.CANONICAL})
+    tmp = cache_file.with_name(cache_file.name + ".tmp.npz")
+    np.savez(tmp,
+             meta=np.array(meta),
+             concepts=panel.concepts.astype(str),
+             **{col: panel.edges[col].to_numpy() for col in panel.edges.columns})
+    os.replace(tmp, cache_file)
+
+
+def _read_panel_cache(cache_file: Path, signature) -> Optional[EdgePanel]:
+    if not Path(cache_file).exists():
+        return None
+    with np.load(cache_file, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        # les caches écrits avant le dédoublonnage (halve_duplicates) sont ignorés
+        if meta["signature"] != signature or meta.get("pairs") != edge_files.CANONICAL:
+            return None
+        concepts = data["concepts"].astype(object)
+        edges = pd.DataFrame({col: data[col] for col in data.files if col not in ("meta", "concepts")})
+    return _make_panel(edges, concepts)
+
+
+def pair_series(panel: EdgePanel, pair: Tuple[str, str], years: Iterable[int]) -> pd.DataFrame:
+    """
+    Série annuelle (year, weight, citation_sum_year) d'une paire, complétée par des 0,
+    lue dans l'index trié by_pair au lieu de filtrer toute la table.
+    """
+    key = pair_keys(panel, [pair])[0]
+    years = list(years)
+    try:
+        series = panel.by_pair.loc[key]
+    except KeyError:
+        series = pd.DataFrame(columns=SERIES_COLUMNS, dtype=float)
+    return (series.reindex(years, fill_value=0)
+                  .rename_axis("year")
+                  .reset_index())
+
+
+def pair_labels(panel: EdgePanel, keys: Iterable[int]) -> List[Tuple[str, str]]:
+    """Clés int64 -> tuples (concept_a, concept_b) triés."""
+    keys = np.asarray(keys, dtype=np.int64)
+    n = len(panel.concepts)
+    return list(zip(panel.concepts[keys // n], panel.concepts[keys % n]))
+
+
+def pair_keys(panel: EdgePanel, pairs: Iterable[Tuple[str, str]]) -> np.ndarray:
+    """Tuples (concept_a, concept_b), dans n'importe quel ordre -> clés int64 (-1 si inconnue)."""
+    pairs = list(pairs)
+    if not pairs:
+        return np.empty(0, dtype=np.int64)
+    index = pd.Index(panel.concepts)
+    a = index.get_indexer([p[0] for p in pairs]).astype(np.int64)
+    b = index.get_indexer([p[1] for p in pairs]).astype(np.int64)
+    keys = np.minimum(a, b) * len(panel.concepts) + np.maximum(a, b)
+    keys[(a < 0) | (b < 0)] = -1
+    return keys
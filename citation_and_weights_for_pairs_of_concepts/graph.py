@@ -1,11 +1,11 @@
 from pathlib import Path
 import os, itertools, collections
-import re
 import matplotlib.pyplot as plt
 import numpy as np
 from scipy.stats import linregress
 from sklearn.linear_model import LinearRegression
-import pandas as pd
+
+from edge_panel import load_edge_panel
 
 # Directory for storing results
 root = r"C:/results/"
@@ -18,17 +18,9 @@ FIG_DIR.mkdir(parents=True, exist_ok=True)
 
 # 1. LOAD DATA ----------------------------------------
 
-rows = []
-pat = re.compile(r"edges_(\d{4})\.csv")
-for f in EDGE_DIR.glob("edges_*.csv"):
-    year = int(pat.search(f.name).group(1))
-    df = pd.read_csv(f)
-    if df.empty:
-        continue
-    df["year"] = year
-    df["pair"] = df.apply(lambda r: tuple(sorted((r["source"], r["target"]))), axis=1)
-    rows.append(df[["pair", "year", "weight", "citation_sum_year"]])
-big = pd.concat(rows, ignore_index=True)
+# pairs are int64 keys of the canonical (sorted) concept pair, see edge_panel.py
+panel = load_edge_panel(EDGE_DIR)
+big = panel.edges[["pair", "year", "weight", "citation_sum_year"]].copy()
 
 print(f"Loaded {len(big):,} rows for {big['pair'].nunique():,} unique pairs.")
 
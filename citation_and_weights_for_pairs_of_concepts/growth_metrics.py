@@ -0,0 +1,96 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class PairYearPanel(NamedTuple):
+    """
+    Panel paire x année en matrices creuses (une ligne par paire, une colonne par
+    année du calendrier years[0]..years[-1], y compris les années sans arête).
+    """
+    pairs: np.ndarray          # clé int64 de chaque ligne, triée
+    years: np.ndarray          # année de chaque colonne
+    values: dict               # colonne -> csr_matrix (paires x années), sommes par paire-année
+    present: sp.csr_matrix     # 1 si la paire a une arête cette année-là
+
+
+def pair_year_panel(edges: pd.DataFrame, columns=("weight", "citation_sum_year")) -> PairYearPanel:
+    """Pivote la table longue (pair, year, valeurs) en matrices paires x années."""
+    pairs, row = np.unique(edges["pair"].to_numpy(), return_inverse=True)
+    year = edges["year"].to_numpy()
+    years = np.arange(year.min(), year.max() + 1)
+    col = year - years[0]
+    shape = (len(pairs), len(years))
+
+    values = {
+        c: sp.coo_matrix((edges[c].to_numpy(dtype=float), (row, col)), shape=shape).tocsr()
+        for c in columns
+    }
+    present = sp.coo_matrix((np.ones(len(row)), (row, col)), shape=shape).tocsr()
+    present.data[:] = 1.0
+    present.sort_indices()
+    return PairYearPanel(pairs, years, values, present)
+
+
+def window_sum(matrix: sp.csr_matrix, start: int, stop: int) -> np.ndarray:
+    """Somme par paire sur les colonnes [start, stop) (bornées à la matrice)."""
+    start, stop = max(start, 0), max(stop, 0)
+    if stop <= start:
+        return np.zeros(matrix.shape[0])
+    return np.asarray(matrix[:, start:stop].sum(axis=1)).ravel()
+
+
+def growth_metrics(edges: pd.DataFrame,
+                   delta: int = 3,
+                   latest_year: Optional[int] = None) -> pd.DataFrame:
+    """
+    Métriques par paire calculées par opérations matricielles :
+
+    - weight_total, cites_total : sommes sur toutes les années
+    - year_first, year_last     : première et dernière année avec une arête
+    - weight_last, cites_last   : valeurs de latest_year (NaN si la paire en est absente)
+    - w_last{Δ}, c_last{Δ}      : sommes sur les Δ années finissant à latest_year
+    - w_prev{Δ}, c_prev{Δ}      : sommes sur les Δ années précédentes
+    - weight_growth, cites_growth : (last + 1) / (prev + 1)
+
+    Les fenêtres sont des années du calendrier, pas les Δ plus grandes valeurs.
+    latest_year vaut par défaut la dernière année du panel.
+    """
+    panel = pair_year_panel(edges)
+    weight = panel.values["weight"]
+    cites = panel.values["citation_sum_year"]
+    years = panel.years
+    if latest_year is None:
+        latest_year = int(years[-1])
+    latest = latest_year - years[0]
+
+    # présence triée par année : premier / dernier indice non nul de chaque ligne
+    indptr, indices = panel.present.indptr, panel.present.indices
+    year_first = years[indices[indptr[:-1]]]
+    year_last = years[indices[indptr[1:] - 1]]
+
+    in_latest = window_sum(panel.present, latest, latest + 1) > 0
+    weight_last = np.where(in_latest, window_sum(weight, latest, latest + 1), np.nan)
+    cites_last = np.where(in_latest, window_sum(cites, latest, latest + 1), np.nan)
+
+    last = (latest - delta + 1, latest + 1)
+    prev = (latest - 2 * delta + 1, latest - delta + 1)
+
+    metrics = pd.DataFrame({
+        "pair": panel.pairs,
+        "weight_total": np.asarray(weight.sum(axis=1)).ravel(),
+        "cites_total": np.asarray(cites.sum(axis=1)).ravel(),
+        "year_first": year_first,
+        "year_last": year_last,
+        "weight_last": weight_last,
+        "cites_last": cites_last,
+        f"w_last{delta}": window_sum(weight, *last),
+        f"w_prev{delta}": window_sum(weight, *prev),
+        f"c_last{delta}": window_sum(cites, *last),
+        f"c_prev{delta}": window_sum(cites, *prev),
+    })
+    metrics["weight_growth"] = (metrics[f"w_last{delta}"] + 1) / (metrics[f"w_prev{delta}"] + 1)
+    metrics["cites_growth"] = (metrics[f"c_last{delta}"] + 1) / (metrics[f"c_prev{delta}"] + 1)
+    return metrics
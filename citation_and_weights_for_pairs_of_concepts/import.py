@@ -1,75 +1,162 @@
+import json
+import os
 import time
 import pandas as pd
 import requests
 
-def fetch_quantum_network_works():
+WORKS_URL = "https://api.openalex.org/works"
+WORKS_FILTER = "concepts.id:c186468114"
+CSV_COLUMNS = ["paper_id", "title", "publication_year", "journal", "authors", "citation_count", "concepts"]
+
+def fetch_pages(cursor="*", session=None):
     """
-    Fetch works related to Quantum Networks, handling pagination to get more than 200 results.
+    Yields (results, next_cursor) for each page of works related to Quantum Networks,
+    starting at `cursor` (cursor-based pagination, 200 works per page).
     """
-    url = "https://api.openalex.org/works"
+    session = session or requests.Session()
     params = {
-        "filter": "concepts.id:c186468114",
+        "filter": WORKS_FILTER,
         "sort": "cited_by_count:desc",
         "per_page": 200,
-        # You can also add cursor-based pagination if needed
     }
-    all_results = []
-    cursor = "*"
 
-    while True:
+    while cursor:
         params["cursor"] = cursor
-        response = requests.get(url, params=params)
+        response = session.get(WORKS_URL, params=params)
         response.raise_for_status()
         data = response.json()
 
-        results = data.get("results", [])
-        all_results.extend(results)
-
         meta = data.get("meta", {})
         cursor = meta.get("next_cursor")
-        if not cursor:
-            break
+        yield data.get("results", []), cursor
+
+        if cursor:
+            time.sleep(0.2)  # To respect rate limits
+
+def fetch_quantum_network_works():
+    """
+    Fetch works related to Quantum Networks, handling pagination to get more than 200 results.
+    Everything is kept in memory: use ingest_quantum_network_works for large crawls.
+    """
+    all_results = []
+    for results, _ in fetch_pages():
+        all_results.extend(results)
 
         # Optional: break after a certain number of papers
         # if len(all_results) >= 1000:
         #     break
 
-        time.sleep(0.2)  # To respect rate limits
-
     return all_results
 
+def work_to_record(work):
+    """One OpenAlex work -> one row of the paper table."""
+    paper_id = work.get("id", "N/A").replace("https://openalex.org/", "")
+    title = work.get("display_name", "N/A")
+    pub_year = work.get("publication_year", "N/A")
+    journal = work.get("host_venue", {}).get("display_name", "N/A")
+    authors = ", ".join(
+        auth.get("author", {}).get("display_name", "N/A") for auth in work.get("authorships", [])
+    )
+    citation_count = work.get("cited_by_count", "N/A")
+    concepts_str = ";".join(
+        f"{concept.get('id','N/A')}|{concept.get('display_name','N/A')}|{concept.get('score',1)}"
+        for concept in work.get("concepts", [])
+    )
+    return {
+        "paper_id": paper_id,
+        "title": title,
+        "publication_year": pub_year,
+        "journal": journal,
+        "authors": authors,
+        "citation_count": citation_count,
+        "concepts": concepts_str
+    }
+
 def export_works_to_csv(works, filename="quantum_networks_papers.csv"):
     """
     Export works with publication dates to CSV.
     """
-    records = []
-    for work in works:
-        paper_id = work.get("id", "N/A").replace("https://openalex.org/", "")
-        title = work.get("display_name", "N/A")
-        pub_year = work.get("publication_year", "N/A")
-        journal = work.get("host_venue", {}).get("display_name", "N/A")
-        authors = ", ".join(
-            auth.get("author", {}).get("display_name", "N/A") for auth in work.get("authorships", [])
-        )
-        citation_count = work.get("cited_by_count", "N/A")
-        concepts_str = ";".join(
-            f"{concept.get('id','N/A')}|{concept.get('display_name','N/A')}|{concept.get('score',1)}"
-            for concept in work.get("concepts", [])
-        )
-        records.append({
-            "paper_id": paper_id,
-            "title": title,
-            "publication_year": pub_year,
-            "journal": journal,
-            "authors": authors,
-            "citation_count": citation_count,
-            "concepts": concepts_str
-        })
-
-    df = pd.DataFrame(records)
+    df = pd.DataFrame([work_to_record(work) for work in works], columns=CSV_COLUMNS)
     df.to_csv(filename, index=False, encoding="utf-8")
     print(f"Exported works to {filename}")
 
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_checkpoint(checkpoint_file):
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, encoding="utf-8") as f:
+            return json.load(f)
+    return {"filter": WORKS_FILTER, "next_cursor": "*", "pages": 0, "works": 0, "csv_bytes": 0, "done": False}
+
+def ingest_quantum_network_works(filename="quantum_networks_papers.csv",
+                                 pages_dir="quantum_networks_pages",
+                                 checkpoint_file="quantum_networks_checkpoint.json",
+                                 max_pages=None):
+    """
+    Streaming, resumable version of fetch_quantum_network_works + export_works_to_csv.
+
+    Each page is written to pages_dir/page_NNNNN.jsonl (one work per line) as soon as it
+    arrives, its rows are appended to the CSV, then the checkpoint records the next cursor
+    and the size of the CSV. After a crash, calling the function again truncates the CSV
+    to the checkpointed size (dropping a partially written page) and resumes from the
+    checkpointed cursor. Only one page of works is held in memory.
+
+    max_pages : stop after this many pages in this call (the next call resumes).
+    """
+    state = load_checkpoint(checkpoint_file)
+    if state["filter"] != WORKS_FILTER:
+        raise ValueError(f"{checkpoint_file} was written for filter {state['filter']}, not {WORKS_FILTER}")
+    if state["done"]:
+        print(f"Already complete: {state['works']:,} works in {filename}")
+        return state
+
+    os.makedirs(pages_dir, exist_ok=True)
+    if state["pages"]:
+        print(f"Resuming after page {state['pages']} ({state['works']:,} works)")
+    with open(filename, "a+b") as out:
+        out.truncate(state["csv_bytes"])
+        out.seek(state["csv_bytes"])
+
+        fetched = 0
+        for results, next_cursor in fetch_pages(state["next_cursor"]):
+            page_file = os.path.join(pages_dir, f"page_{state['pages']:05d}.jsonl")
+            _write_atomic(page_file, "".join(json.dumps(work) + "\n" for work in results))
+
+            rows = pd.DataFrame([work_to_record(work) for work in results], columns=CSV_COLUMNS)
+            out.write(rows.to_csv(index=False, header=state["csv_bytes"] == 0).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+
+            state.update(next_cursor=next_cursor, pages=state["pages"] + 1,
+                         works=state["works"] + len(results), csv_bytes=out.tell(),
+                         done=not next_cursor)
+            _write_atomic(checkpoint_file, json.dumps(state))
+            print(f"Page {state['pages']}: {state['works']:,} works")
+
+            fetched += 1
+            if max_pages is not None and fetched >= max_pages:
+                break
+
+    if state["done"]:
+        print(f"Exported works to {filename}")
+    return state
+
+def rebuild_csv_from_pages(pages_dir="quantum_networks_pages", filename="quantum_networks_papers.csv"):
+    """Rewrites the paper table from the saved pages, page by page, without calling the API."""
+    pages = sorted(f for f in os.listdir(pages_dir) if f.endswith(".jsonl"))
+    with open(filename, "wb") as out:
+        for i, page in enumerate(pages):
+            with open(os.path.join(pages_dir, page), encoding="utf-8") as f:
+                works = [json.loads(line) for line in f]
+            rows = pd.DataFrame([work_to_record(work) for work in works], columns=CSV_COLUMNS)
+            out.write(rows.to_csv(index=False, header=i == 0).encode("utf-8"))
+    print(f"Exported works to {filename}")
+
 if __name__ == "__main__":
-    works = fetch_quantum_network_works()
-    export_works_to_csv(works)
\ No newline at end of file
+    ingest_quantum_network_works()
\ No newline at end of file
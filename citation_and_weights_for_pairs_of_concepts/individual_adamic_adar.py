@@ -1,23 +1,46 @@
 import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 import csv
 
-def track_pair_evolution_by_ids(concept1_id, concept2_id):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from oqi_common import score_store
+from oqi_common import pair_index
+
+SCORES_PATTERN = "adamic_scores_by_year/*_adamic_scores.csv"
+INDEX_PATH = "adamic_scores_by_year.sqlite"
+YEARS = [str(year) for year in range(1965, 2024)]
+
+def track_pair_evolution_by_ids(concept1_id, concept2_id, store_dir=None):
     """
     Affiche l'évolution du score Adamic-Adar dans le temps pour une paire de concepts identifiés par leurs IDs.
     
     concept1_id : str
     concept2_id : str
+    store_dir   : si donné, l'historique de la paire est lu en une seule requête
+                  dans le store Parquet au lieu de parcourir chaque CSV annuel.
     """
     years = []
     scores = []
     missing_data = []
 
+    store_scores = None
+    if store_dir:
+        pair_df = score_store.read_scores(store_dir, pairs=[(concept1_id, concept2_id)])
+        store_scores = dict(zip(pair_df["period"], pair_df["AdamicAdarScore"].astype(float)))
+        store_periods = set(score_store.list_periods(store_dir))
+
     for year in range(1965, 2024):
         filename = f"adamic_scores_by_year/{year}_adamic_scores.csv"
         years.append(str(year))
 
+        if store_scores is not None:
+            if str(year) not in store_periods:
+                missing_data.append(year)
+            scores.append(store_scores.get(str(year), float("nan")))
+            continue
+
         if not os.path.exists(filename):
             scores.append(float("nan"))
             missing_data.append(year)
@@ -39,7 +62,11 @@ def track_pair_evolution_by_ids(concept1_id, concept2_id):
         if not found:
             scores.append(float("nan"))
 
-    # Affichage du graphe
+    plot_pair_evolution(concept1_id, concept2_id, years, scores, missing_data)
+
+
+def plot_pair_evolution(concept1_id, concept2_id, years, scores, missing_data):
+    """Affiche la courbe du score Adamic-Adar d'une paire de concepts."""
     plt.figure(figsize=(10, 5))
     plt.plot(years, scores, marker='o', linestyle='-', color='blue', label=f"{concept1_id} - {concept2_id}")
     plt.xticks(rotation=45)
@@ -55,31 +82,64 @@ def track_pair_evolution_by_ids(concept1_id, concept2_id):
     if missing_data:
         print("📂 Fichiers manquants pour les années :", missing_data)
 
-track_pair_evolution_by_ids('C206040425','C5320026')
-track_pair_evolution_by_ids('C78203541','C186468114')
-track_pair_evolution_by_ids('C118704821','C91717678')
-track_pair_evolution_by_ids('C2778361524','C95013731')
-track_pair_evolution_by_ids('C104434177','C190463098')
-track_pair_evolution_by_ids('C104434177','C203103908')
-track_pair_evolution_by_ids('C124148022','C51003876')
-track_pair_evolution_by_ids('C124148022','C2779094486')
-track_pair_evolution_by_ids('C124148022','C190463098')
-track_pair_evolution_by_ids('C144901912','C190463098')
-track_pair_evolution_by_ids('C139356082','C190463098')
-track_pair_evolution_by_ids('C51003876','C5320026')
-track_pair_evolution_by_ids('C51003876','C11255438')
-track_pair_evolution_by_ids('C51003876','C89143813')
-track_pair_evolution_by_ids('C51003876','C91717678')
-track_pair_evolution_by_ids('C59500034','C186468114')
-track_pair_evolution_by_ids('C58849907','C190463098')
-track_pair_evolution_by_ids('C22984246','C203103908')
-track_pair_evolution_by_ids('C5320026','C95013731')
-track_pair_evolution_by_ids('C2779094486','C186468114')
-track_pair_evolution_by_ids('C186468114','C138622882')
-track_pair_evolution_by_ids('C186468114','C192122513')
-track_pair_evolution_by_ids('C186468114','C11255438')
-track_pair_evolution_by_ids('C186468114','C62641251')
-track_pair_evolution_by_ids('C186468114','C140058369')
-track_pair_evolution_by_ids('C11255438','C190463098')
-track_pair_evolution_by_ids('C89143813','C91717678')
-track_pair_evolution_by_ids('C161166931','C190463098')
\ No newline at end of file
+
+def load_pair_index(index_path=INDEX_PATH, csv_pattern=SCORES_PATTERN):
+    """
+    Ouvre l'index paire -> (année, score). Il est (re)construit à partir des CSV annuels
+    s'il n'existe pas encore ou si un CSV a été ajouté, modifié, renommé ou supprimé
+    depuis (signature nom / mtime / taille, voir pair_index.open_pair_index).
+    """
+    return pair_index.open_pair_index(index_path, csv_pattern)
+
+
+def track_pairs_evolution_by_ids(pairs, index_path=INDEX_PATH):
+    """
+    Version par lots de track_pair_evolution_by_ids : les historiques de toutes les paires
+    sont lus en une seule requête sur l'index, puis une courbe est affichée par paire.
+
+    pairs : liste de (concept1_id, concept2_id)
+    """
+    conn = load_pair_index(index_path)
+    periods = set(pair_index.indexed_periods(conn))
+    histories = pair_index.pair_histories(conn, pairs)
+    conn.close()
+
+    missing_data = [int(year) for year in YEARS if year not in periods]
+    for concept1_id, concept2_id in pairs:
+        history = histories[(concept1_id, concept2_id)]
+        scores = [history.get(year, float("nan")) for year in YEARS]
+        plot_pair_evolution(concept1_id, concept2_id, YEARS, scores, missing_data)
+
+
+TRACKED_PAIRS = [
+    ('C206040425', 'C5320026'),
+    ('C78203541', 'C186468114'),
+    ('C118704821', 'C91717678'),
+    ('C2778361524', 'C95013731'),
+    ('C104434177', 'C190463098'),
+    ('C104434177', 'C203103908'),
+    ('C124148022', 'C51003876'),
+    ('C124148022', 'C2779094486'),
+    ('C124148022', 'C190463098'),
+    ('C144901912', 'C190463098'),
+    ('C139356082', 'C190463098'),
+    ('C51003876', 'C5320026'),
+    ('C51003876', 'C11255438'),
+    ('C51003876', 'C89143813'),
+    ('C51003876', 'C91717678'),
+    ('C59500034', 'C186468114'),
+    ('C58849907', 'C190463098'),
+    ('C22984246', 'C203103908'),
+    ('C5320026', 'C95013731'),
+    ('C2779094486', 'C186468114'),
+    ('C186468114', 'C138622882'),
+    ('C186468114', 'C192122513'),
+    ('C186468114', 'C11255438'),
+    ('C186468114', 'C62641251'),
+    ('C186468114', 'C140058369'),
+    ('C11255438', 'C190463098'),
+    ('C89143813', 'C91717678'),
+    ('C161166931', 'C190463098'),
+]
+
+track_pairs_evolution_by_ids(TRACKED_PAIRS)
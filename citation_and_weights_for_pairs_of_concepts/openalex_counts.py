@@ -0,0 +1,172 @@
+"""
+Asynchronous fetcher for the yearly citation counts (counts_by_year) of OpenAlex works.
+
+Works are requested by batches of up to 50 IDs with the list endpoint
+(/works?filter=ids.openalex:W1|W2|...), over one pooled aiohttp session.
+Requests go through a token-bucket rate limiter. 429 and 5xx answers, as
+well as connection errors and timeouts, are retried with exponential
+backoff (or after Retry-After when the server sends it).
+
+Works of a batch that still fails, and works missing from the answers, get
+an empty counts_by_year (i.e. 0 citations every year); they are reported at
+the end of the run and can be collected with the `failed` / `missing` lists.
+
+base_url can point to a local stub server for testing.
+"""
+import asyncio
+import random
+import time
+
+import aiohttp
+from tqdm import tqdm
+
+OPENALEX_URL = "https://api.openalex.org"
+MAX_IDS_PER_REQUEST = 50
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def short_id(work_id):
+    """'https://openalex.org/W123' -> 'W123'."""
+    return str(work_id).rstrip("/").split("/")[-1]
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _fetch_batch(session, bucket, base_url, ids, max_retries, backoff, mailto):
+    """{work_id: counts_by_year} for one batch of IDs; None if the batch keeps failing."""
+    params = {
+        "filter": "ids.openalex:" + "|".join(ids),
+        "per-page": str(len(ids)),
+        "select": "id,counts_by_year",
+    }
+    if mailto:
+        params["mailto"] = mailto
+
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(f"{base_url}/works", params=params) as response:
+                if response.status in RETRY_STATUSES:
+                    raise RetryableError(f"HTTP {response.status}", _retry_after(response.headers))
+                response.raise_for_status()
+                data = await response.json()
+            return {short_id(work["id"]): work.get("counts_by_year", [])
+                    for work in data.get("results", [])}
+        except aiohttp.ClientResponseError as e:
+            # other 4xx: the request itself is wrong, retrying will not help
+            print(f"Error fetching counts for {ids[0]}..{ids[-1]}: {e}")
+            return None
+        except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                print(f"Error fetching counts for {ids[0]}..{ids[-1]} after {attempt + 1} tries: {e}")
+                return None
+            delay = getattr(e, "retry_after", None)
+            if delay is None:
+                delay = backoff * 2 ** attempt * (1 + random.random())
+            await asyncio.sleep(delay)
+    return None
+
+
+def _report_zero_filled(label, work_ids, shown=20):
+    if work_ids:
+        listed = ", ".join(work_ids[:shown]) + (", ..." if len(work_ids) > shown else "")
+        print(f"{len(work_ids)} works {label}, counts set to 0: {listed}")
+
+
+async def fetch_counts_by_year_async(work_ids,
+                                     base_url=OPENALEX_URL,
+                                     rate=8.0,
+                                     concurrency=8,
+                                     batch_size=MAX_IDS_PER_REQUEST,
+                                     max_retries=5,
+                                     backoff=1.0,
+                                     timeout=30,
+                                     mailto=None,
+                                     failed=None,
+                                     missing=None):
+    """
+    Fetches counts_by_year for many OpenAlex works.
+
+    work_ids    : OpenAlex IDs, full URLs or short 'W...' IDs
+    rate        : maximum number of requests per second (token bucket)
+    concurrency : maximum number of requests in flight
+    batch_size  : IDs per request (at most 50)
+    failed      : if given, list extended with the IDs of the works whose batch
+                  failed after every retry
+    missing     : if given, list extended with the IDs absent from the answers
+    Returns {short work id: list of {'year', 'cited_by_count', ...}}; the failed
+    and missing works get an empty list, and are reported when done.
+    """
+    ids = list(dict.fromkeys(short_id(w) for w in work_ids))
+    batch_size = min(batch_size, MAX_IDS_PER_REQUEST)
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+    bucket = TokenBucket(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {}
+    failed_ids = []
+
+    async def run(batch):
+        async with semaphore:
+            return batch, await _fetch_batch(session, bucket, base_url.rstrip("/"), batch,
+                                             max_retries, backoff, mailto)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Fetching counts_by_year"):
+            batch, batch_counts = await task
+            if batch_counts is None:
+                failed_ids.extend(batch)
+            else:
+                counts.update(batch_counts)
+
+    failed_set = set(failed_ids)
+    failed_ids = [w for w in ids if w in failed_set]
+    missing_ids = [w for w in ids if w not in counts and w not in failed_set]
+    _report_zero_filled("in failed batches", failed_ids)
+    _report_zero_filled("missing from the answers", missing_ids)
+    if failed is not None:
+        failed.extend(failed_ids)
+    if missing is not None:
+        missing.extend(missing_ids)
+    return {work_id: counts.get(work_id, []) for work_id in ids}
+
+
+def fetch_counts_by_year_many(work_ids, **kwargs):
+    """Synchronous wrapper of fetch_counts_by_year_async (same arguments)."""
+    return asyncio.run(fetch_counts_by_year_async(work_ids, **kwargs))
@@ -5,6 +5,9 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import random
 
+from edge_panel import EdgePanel, load_edge_panel, pair_labels, pair_series
+from growth_metrics import growth_metrics
+
 root = r"C:/results/"
 os.makedirs(root, exist_ok=True)
 EDGE_DIR = Path(os.path.join(root,"raw_graph1"))
@@ -14,62 +17,21 @@ ROOT = r"C:/results/"
 EDGE_DIR = Path(ROOT, "raw_graph1")
 FIG_DIR = Path(ROOT, "figures2", "selected_pairs2")
 FIG_DIR.mkdir(parents=True, exist_ok=True)
+# panel des arêtes conservé entre deux exécutions (invalidé si un fichier d'arêtes annuel change)
+EDGE_CACHE = Path(ROOT, "edge_panel_cache.npz")
 
 
 # -------------------------------------------------------------------
 # 1.  métriques pour chaque paire
 # -------------------------------------------------------------------
-def build_edge_metrics(edge_dir: Path) -> pd.DataFrame:
-    rows, pat = [], re.compile(r"edges_(\d{4})\.csv")
-    for f in edge_dir.glob("edges_*.csv"):
-        year = int(pat.search(f.name).group(1))
-        df = pd.read_csv(f)
-        if df.empty:
-            continue
-        df["pair"] = df.apply(
-            lambda r: tuple(sorted((r["source"], r["target"]))), axis=1)
-        # --- Fix duplicates: divide by 2 ---
-        df["weight"] = df["weight"] / 2
-        df["citation_sum_year"] = df["citation_sum_year"] / 2
-        # Optionally:
-        # df["citation_sum_year2"] = df["citation_sum_year2"] / 2
-        # -------------------------------
-        df["year"] = year
-        rows.append(df)
-
-    big = pd.concat(rows, ignore_index=True)
-
-    grouped = (big.groupby("pair")
-                 .agg(weight_total=("weight", "sum"),
-                      cites_total=("citation_sum_year", "sum"),
-                      year_first=("year", "min"),
-                      year_last=("year", "max"))
-                 .reset_index())
-
-    latest_year = big["year"].max()
-    latest = big[big["year"] == latest_year] \
-             .groupby("pair") \
-             .agg(weight_last=("weight", "sum"),
-                  cites_last=("citation_sum_year", "sum"))
-
-    grouped = grouped.merge(latest, on="pair", how="left")
-
-    Δ = 3
-    def last_n(s, n):
-        return s.sort_values().tail(n).sum()
-
-    tmp = (big.groupby("pair")
-             .agg(w_last3=("weight", lambda s: last_n(s, Δ)),
-                  w_prev3=("weight",
-                           lambda s: last_n(s.iloc[:-Δ] if len(s) > Δ else s*0, Δ)),
-                  c_last3=("citation_sum_year", lambda s: last_n(s, Δ)),
-                  c_prev3=("citation_sum_year",
-                           lambda s: last_n(s.iloc[:-Δ] if len(s) > Δ else s*0, Δ)))
-             .reset_index())
-
-    grouped = grouped.merge(tmp, on="pair", how="left")
-    grouped["weight_growth"] = (grouped["w_last3"]+1)/(grouped["w_prev3"]+1)
-    grouped["cites_growth"]  = (grouped["c_last3"]+1)/(grouped["c_prev3"]+1)
+def build_edge_metrics(edge_dir: Path, panel: EdgePanel = None, delta: int = 3) -> pd.DataFrame:
+    # les paires sont des clés int64 (voir edge_panel.py), converties en tuples à la fin
+    # delta : taille (en années) des fenêtres w_last/w_prev et c_last/c_prev
+    if panel is None:
+        panel = load_edge_panel(edge_dir)
+
+    grouped = growth_metrics(panel.edges, delta=delta)
+    grouped["pair"] = pair_labels(panel, grouped["pair"])
     return grouped
 
 
@@ -114,40 +76,21 @@ def select_pairs(metrics: pd.DataFrame,
 def visualise_pairs(pairs: List[Tuple[str, str]],
                     edge_dir: Path,
                     out_dir: Path,
-                    show: bool = False):
+                    show: bool = False,
+                    panel: EdgePanel = None):
 
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rows, pat = [], re.compile(r"edges_(\d{4})\.csv")
-    for f in edge_dir.glob("edges_*.csv"):
-        year = int(pat.search(f.name).group(1))
-        df = pd.read_csv(f)
-        if df.empty:
-            continue
-        df["pair"] = df.apply(
-            lambda r: tuple(sorted((r["source"], r["target"]))), axis=1)
-        # --- Fix duplicates: divide by 2 ---
-        df["weight"] = df["weight"] / 2
-        df["citation_sum_year"] = df["citation_sum_year"] / 2
-        # Optionally:
-        # df["citation_sum_year2"] = df["citation_sum_year2"] / 2
-        # -------------------------------
-        df["year"] = year
-        rows.append(df)
-    big = pd.concat(rows, ignore_index=True)
+    if panel is None:
+        panel = load_edge_panel(edge_dir)
+    big = panel.edges
     all_years = range(big["year"].min(), big["year"].max()+1)
 
     # pré-calcul des limites
     max_w = max_c = max_w_c = max_c_c = 0
     prepared = {}
     for pair in pairs:
-        dfp = (big[big["pair"] == pair]
-               .groupby("year", as_index=False)
-               .agg(weight=("weight", "sum"),
-                    citation_sum_year=("citation_sum_year", "sum"))) \
-            .set_index("year") \
-            .reindex(all_years, fill_value=0) \
-            .reset_index()
+        dfp = pair_series(panel, pair, all_years)
 
         dfp["weight_cum"] = dfp["weight"].cumsum()
         dfp["citation_sum_year"] = dfp["citation_sum_year"]  # per-year
@@ -214,14 +157,16 @@ def visualise_pairs(pairs: List[Tuple[str, str]],
 # 4.  exécuter tous les classements dans des dossiers séparés
 # -------------------------------------------------------------------
 def run_all_rankings(k: int = 5, seed: int = 42):
-    metrics = build_edge_metrics(EDGE_DIR)
+    # les fichiers d'arêtes sont lus une seule fois pour tous les classements
+    panel = load_edge_panel(EDGE_DIR, cache_file=EDGE_CACHE)
+    metrics = build_edge_metrics(EDGE_DIR, panel=panel)
     modes = ["cites_total", "cites_last", "cites_growth",
              "weight_total", "weight_growth", "newcomer"]
 
     for mode in modes:
         pairs = select_pairs(metrics, mode, k=k, seed=seed)
         out_dir = FIG_DIR / mode
-        visualise_pairs(pairs, EDGE_DIR, out_dir, show=False)
+        visualise_pairs(pairs, EDGE_DIR, out_dir, show=False, panel=panel)
         print(f"➡️  {mode}: {len(pairs)} paires sauvegardées dans {out_dir}")
 
 # lancez-le :
@@ -1,105 +1,83 @@
 import os
+import sys
 import glob
-from collections import defaultdict
 
-import pandas as pd
-import re
-import requests
 import matplotlib.pyplot as plt
 
-def get_display_name(concept_id):
-    url = f'https://api.openalex.org/concepts/{concept_id}'
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('display_name', concept_id)
-        else:
-            print(f"Failed to fetch {concept_id}: {response.status_code}")
-            return concept_id
-    except Exception as e:
-        print(f"Error fetching {concept_id}: {e}")
-        return concept_id
-
-def parse_season(season, year):
-    season_order_map = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4}
-    return (year, season_order_map.get(season.lower(), 0))
-
-# 1. Collect filenames and parse season-year info
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from oqi_common import concept_cache
+from oqi_common import pair_period
+from oqi_common import periods
+
+# names already present in the paper table: no request needed for those concepts
+PAPERS_CSV = 'quantum_networks_subtree_papers_dates.csv'
+
+SUFFIX = '_jac_scores.csv'
+QUARTER = periods.QUARTER
+
+# pair x season matrix kept between runs, memory-mapped (None: always re-read the season files)
+MATRIX_CACHE = 'season_csvs.jaccard_matrix'
+
+
+def load_season_scores(files, full_periods, cache_dir=MATRIX_CACHE):
+    """
+    Jaccard scores of the season files {period ID: path} as a pair x season
+    matrix: the files are read concurrently and pivoted once
+    (pair_period.read_score_files). The matrix saved in cache_dir is reused as
+    long as the files and the season range are unchanged.
+    """
+    signature = {"files": pair_period.files_signature(files.values()),
+                 "periods": [int(full_periods[0]), int(full_periods[-1])]}
+    if cache_dir:
+        matrix = pair_period.load(cache_dir, signature)
+        if matrix is not None:
+            return matrix
+    matrix = pair_period.read_score_files(files, 'JaccardScore', unit=QUARTER, periods=full_periods)
+    if cache_dir:
+        pair_period.save(matrix, cache_dir, signature)
+    return matrix
+
+
+# 1. Collect filenames and parse their period ("winter_2020" -> integer quarter ID, see oqi_common/periods.py)
 csv_dir = 'season_csvs'
-pattern = re.compile(r'(spring|summer|fall|winter)_(\d{4})_jac_scores\.csv', re.IGNORECASE)
 
-season_years = []
+season_files = {}
 
-for filename in glob.glob(os.path.join(csv_dir, '*_jac_scores.csv')):
+for filename in glob.glob(os.path.join(csv_dir, '*' + SUFFIX)):
     basename = os.path.basename(filename)
-    match = pattern.match(basename)
-    if match:
-        season, year = match.groups()
-        season = season.lower()
-        year = int(year)
-        season_years.append((season, year))
+    period_id = QUARTER.parse_label(basename[:-len(SUFFIX)])
+    if period_id is not None:
+        season_files[period_id] = filename
     else:
         print(f"Filename pattern not matched: {basename}")
 
 # 2. Generate full season list from 2000 onward
-if season_years:
-    parsed_seasons = [ (s, y) for s, y in season_years ]
-    min_year = min(y for _, y in parsed_seasons if y >= 2000)
-    max_year = max(y for _, y in parsed_seasons)
+if season_files:
+    min_year = min(QUARTER.start_month(p)[0] for p in season_files if QUARTER.start_month(p)[0] >= 2000)
+    max_year = max(QUARTER.start_month(p)[0] for p in season_files)
 
-    season_order_map = {'winter': 1, 'spring': 2, 'summer': 3, 'fall': 4}
     # Generate all seasons from 2000 to max_year
-    full_seasons = []
-    for year in range(max(2000, min_year), max_year + 1):
-        for season in ['winter', 'spring', 'summer', 'fall']:
-            if year == min_year and parse_season(season, year)[1] < season_order_map[season]:
-                # Skip seasons before min_year in that year
-                continue
-            full_seasons.append(f"{season}_{year}")
-
-# 3. Read data
-pair_time_series = defaultdict(dict)
-for filename in glob.glob(os.path.join(csv_dir, '*_jac_scores.csv')):
-    basename = os.path.basename(filename)
-    match = pattern.match(basename)
-    if match:
-        season, year = match.groups()
-        season = season.lower()
-        year = int(year)
-        # Skip years before 2000
-        if year < 2000:
-            continue
-        df = pd.read_csv(filename)
-        for _, row in df.iterrows():
-            c1, c2, score = row['Concept1'], row['Concept2'], row['JaccardScore']
-            pair = tuple(sorted([c1, c2]))
-            season_name = f"{season}_{year}"
-            pair_time_series[pair][season_name] = score
-
-# 4. Build DataFrame with all pairs and seasons
-# 4. Build DataFrame with all pairs and seasons
-rows = []
-for pair, season_scores in pair_time_series.items():
-    row = {
-        'Concept1': pair[0],
-        'Concept2': pair[1],
-        'Concepts': f"{pair[0]} & {pair[1]}"
-    }
-    for season in full_seasons:
-        row[season] = season_scores.get(season, None)
-    rows.append(row)
-
-df_time = pd.DataFrame(rows)
-
-
-# 5. Get top 10 pairs by average Jaccard score
-df_time['AverageScore'] = df_time[full_seasons].mean(axis=1)
-top_df = df_time.sort_values('AverageScore', ascending=False).head(10)
-
-# 6. Fetch display names only for top 10 pairs
+    first_period = periods.year_start(QUARTER, max(2000, min_year))
+    last_period = periods.year_start(QUARTER, max_year + 1) - 1
+    full_periods = QUARTER.period_range(first_period, last_period)
+    full_seasons = [QUARTER.label(p) for p in full_periods]
+
+# 3. Read data into a pair x season matrix (oqi_common/pair_period.py); files before 2000 are skipped
+jaccard = load_season_scores({p: f for p, f in season_files.items() if p >= first_period}, full_periods)
+
+# 4. Top 10 pairs by average Jaccard score (over the seasons where the pair has a score)
+average = pair_period.mean(jaccard)
+top = pair_period.top_rows(average, 10)
+
+# 5. Wide table (one column per season) of those pairs only
+top_df = pair_period.to_frame(jaccard, top)
+top_df['AverageScore'] = average[top]
+
+# 6. Display names of the top 10 pairs (persistent cache, batched requests for unknown concepts)
 top_concepts = set(top_df['Concept1']) | set(top_df['Concept2'])
-concept_names = {cid: get_display_name(cid) for cid in top_concepts}
+if os.path.exists(PAPERS_CSV):
+    concept_cache.seed_from_papers_csv(PAPERS_CSV)
+concept_names = concept_cache.display_names(top_concepts)
 
 # 7. Plot top 10 pairs
 plt.figure(figsize=(20, 12))
@@ -1,46 +1,26 @@
+import os
+import sys
 import pandas as pd
 import rdflib
-import requests
 from rdflib import Namespace
 import matplotlib.pyplot as plt
 
-def get_display_name(concept_id):
-    url = f'https://api.openalex.org/concepts/{concept_id}'
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('display_name', concept_id)
-        else:
-            print(f"Failed to fetch {concept_id}: {response.status_code}")
-            return concept_id
-    except Exception as e:
-        print(f"Error fetching {concept_id}: {e}")
-        return concept_id
-
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from oqi_common import concept_cache
+from oqi_common import incidence
 
 # Files
 TTL_FILE = 'filtered_citations.ttl'
 CSV_FILE = 'quantum_networks_subtree_papers_dates100.csv'
 
 
-# Load your CSV with papers and concepts
-df = pd.read_csv('quantum_networks_subtree_papers_dates100.csv')
-
-# Build a dictionary: paper_id -> set of concept IDs
-paper_concept_pools = {}
-for _, row in df.iterrows():
-    paper_id = row['paper_id']
-    concepts_str = row['concepts']
-    concept_ids = set()
-    if pd.notnull(concepts_str):
-        for item in concepts_str.split(';'):
-            if item:
-                parts = item.split('|')
-                if len(parts) >= 1:
-                    cid = parts[0]
-                    concept_ids.add(cid)
-    paper_concept_pools[paper_id] = concept_ids
+# Build a dictionary: paper_id -> set of concept IDs, from the pre-parsed incidence store
+# of the CSV (oqi_common/incidence.py) instead of splitting the concepts column again
+papers = incidence.load_incidence(CSV_FILE)
+paper_concept_pools = {
+    paper_id: set(papers.concept_links[papers.indices[start:end]].tolist())
+    for paper_id, start, end in zip(papers.paper_ids.tolist(), papers.indptr[:-1], papers.indptr[1:])
+}
 
 # Load graph
 g = rdflib.Graph()
@@ -121,13 +101,10 @@ top_pairs = (
 )
 top_pairs_list = top_pairs.index.tolist()
 
-# Create a cache for concept display names
-concept_names = {}
-
-# Fetch display names only once per concept
+# Concept display names from the persistent cache, seeded with the names of the paper table
 unique_concepts = set([cid for pair in top_pairs_list for cid in pair])
-for cid in unique_concepts:
-    concept_names[cid] = get_display_name(cid)
+concept_cache.seed_from_papers_csv(CSV_FILE)
+concept_names = concept_cache.display_names(unique_concepts)
 
 # Plotting
 plt.figure(figsize=(32, 20))
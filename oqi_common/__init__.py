@@ -0,0 +1,6 @@
+"""
+Shared helpers for the OQI analysis scripts.
+
+The scripts in this repository are run from their own folder; they add the
+repository root to ``sys.path`` before importing from ``oqi_common``.
+"""
@@ -0,0 +1,205 @@
+"""
+Persistent cache of OpenAlex concept metadata (display name, level) shared by all scripts.
+
+Concepts are stored in a local SQLite file under their short ID ('C123'), so
+plots never have to wait for one HTTP request per concept:
+
+- the cache can be seeded without any network access, from concepts_levels.csv
+  (levels) and from the `concepts` column of the paper tables
+  ("https://openalex.org/C...|name|score;..."), which already holds the names;
+- missing or expired names are fetched 50 at a time with
+  /concepts?filter=openalex:C1|C2|... instead of one request per concept;
+- in offline mode (offline=True or OQI_OFFLINE=1) nothing is fetched and unknown
+  concepts fall back to their ID, like the former get_display_name did on errors.
+"""
+import os
+import time
+import sqlite3
+
+import pandas as pd
+import requests
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "concept_cache.sqlite")
+OPENALEX_URL = "https://api.openalex.org"
+DEFAULT_TTL = 90 * 24 * 3600   # seconds before a name is fetched again
+BATCH_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS concepts (
+    concept_id   TEXT PRIMARY KEY,
+    display_name TEXT,
+    level        INTEGER,
+    fetched_at   REAL
+);
+CREATE TABLE IF NOT EXISTS seeded_files (
+    path      TEXT PRIMARY KEY,
+    signature TEXT
+);
+"""
+
+_default_conn = None
+
+
+def short_id(concept_id):
+    """'https://openalex.org/C123' -> 'C123'."""
+    return str(concept_id).rstrip("/").split("/")[-1]
+
+
+def connect(db_path=DEFAULT_DB):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def default_connection():
+    """Connection to the shared cache file, opened once per process."""
+    global _default_conn
+    if _default_conn is None:
+        _default_conn = connect(os.environ.get("OQI_CONCEPT_CACHE", DEFAULT_DB))
+    return _default_conn
+
+
+def is_offline(offline=None):
+    if offline is None:
+        return os.environ.get("OQI_OFFLINE", "") not in ("", "0")
+    return offline
+
+
+def store_names(conn, names, fetched_at=None):
+    """Inserts or updates {concept_id: display_name}."""
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    with conn:
+        conn.executemany(
+            "INSERT INTO concepts (concept_id, display_name, fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(concept_id) DO UPDATE SET display_name = excluded.display_name, "
+            "fetched_at = excluded.fetched_at",
+            [(short_id(cid), name, fetched_at) for cid, name in names.items()],
+        )
+
+
+def store_levels(conn, levels):
+    """Inserts or updates {concept_id: level}, keeping the names already known."""
+    with conn:
+        conn.executemany(
+            "INSERT INTO concepts (concept_id, level) VALUES (?, ?) "
+            "ON CONFLICT(concept_id) DO UPDATE SET level = excluded.level",
+            [(short_id(cid), int(level)) for cid, level in levels.items()],
+        )
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _already_seeded(conn, path):
+    row = conn.execute("SELECT signature FROM seeded_files WHERE path = ?",
+                       (os.path.abspath(path),)).fetchone()
+    return row is not None and row[0] == _file_signature(path)
+
+
+def _mark_seeded(conn, path):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO seeded_files VALUES (?, ?)",
+                     (os.path.abspath(path), _file_signature(path)))
+
+
+def seed_from_levels_csv(csv_path, conn=None):
+    """Loads the levels of concepts_levels.csv (columns concept_id, level); skipped if unchanged."""
+    conn = conn or default_connection()
+    if _already_seeded(conn, csv_path):
+        return
+    levels = pd.read_csv(csv_path)
+    store_levels(conn, dict(zip(levels["concept_id"], levels["level"])))
+    _mark_seeded(conn, csv_path)
+
+
+def seed_from_papers_csv(csv_path, column="concepts", conn=None, chunksize=100_000):
+    """
+    Loads the names embedded in the `concepts` column of a paper table
+    ("id|name|score;id|name|score;..."); skipped if the file has not changed.
+    Names coming from the papers are stored with fetched_at = 0 only for
+    concepts that have no name yet, so they never replace a name from the API.
+    """
+    conn = conn or default_connection()
+    if _already_seeded(conn, csv_path):
+        return
+    for chunk in pd.read_csv(csv_path, usecols=[column], chunksize=chunksize):
+        parts = chunk[column].dropna().str.split(";").explode()
+        parsed = parts.str.extract(r"^([^|]+)\|(.*)\|[^|]*$").dropna()
+        names = dict(zip(parsed[0].map(short_id), parsed[1]))
+        with conn:
+            conn.executemany(
+                "INSERT INTO concepts (concept_id, display_name, fetched_at) VALUES (?, ?, 0) "
+                "ON CONFLICT(concept_id) DO UPDATE SET display_name = excluded.display_name, "
+                "fetched_at = 0 WHERE concepts.display_name IS NULL",
+                names.items(),
+            )
+    _mark_seeded(conn, csv_path)
+
+
+def _fetch_batch(session, ids, base_url):
+    response = session.get(f"{base_url}/concepts", params={
+        "filter": "openalex:" + "|".join(ids),
+        "per-page": str(len(ids)),
+        "select": "id,display_name,level",
+    })
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+def prefetch(concept_ids, conn=None, ttl=DEFAULT_TTL, offline=None, base_url=OPENALEX_URL):
+    """
+    Makes sure the given concepts are in the cache: concepts without a name, or
+    whose name was fetched from the API more than `ttl` seconds ago, are
+    requested in batches of 50. Names seeded from the paper tables do not expire.
+    """
+    conn = conn or default_connection()
+    if is_offline(offline):
+        return
+    ids = sorted({short_id(cid) for cid in concept_ids})
+    known = {}
+    for start in range(0, len(ids), 500):
+        part = ids[start:start + 500]
+        known.update(conn.execute(
+            f"SELECT concept_id, fetched_at FROM concepts WHERE display_name IS NOT NULL "
+            f"AND concept_id IN ({','.join('?' * len(part))})", part))
+
+    now = time.time()
+    todo = [cid for cid in ids
+            if cid not in known or (ttl is not None and known[cid] and known[cid] < now - ttl)]
+    if not todo:
+        return
+
+    session = requests.Session()
+    for start in range(0, len(todo), BATCH_SIZE):
+        batch = todo[start:start + BATCH_SIZE]
+        try:
+            results = _fetch_batch(session, batch, base_url)
+        except Exception as e:
+            print(f"Error fetching concepts {batch[0]}..{batch[-1]}: {e}")
+            continue
+        store_names(conn, {r["id"]: r.get("display_name") for r in results if r.get("display_name")},
+                    fetched_at=now)
+        store_levels(conn, {r["id"]: r["level"] for r in results if r.get("level") is not None})
+
+
+def display_names(concept_ids, conn=None, ttl=DEFAULT_TTL, offline=None):
+    """{concept_id: display name} (the ID itself when the name is unknown), keys as given."""
+    conn = conn or default_connection()
+    concept_ids = list(concept_ids)
+    prefetch(concept_ids, conn=conn, ttl=ttl, offline=offline)
+
+    ids = sorted({short_id(cid) for cid in concept_ids})
+    names = {}
+    for start in range(0, len(ids), 500):
+        part = ids[start:start + 500]
+        names.update(conn.execute(
+            f"SELECT concept_id, display_name FROM concepts WHERE display_name IS NOT NULL "
+            f"AND concept_id IN ({','.join('?' * len(part))})", part))
+    return {cid: names.get(short_id(cid), cid) for cid in concept_ids}
+
+
+def get_display_name(concept_id, conn=None, offline=None):
+    """Display name of one concept (its ID if unknown); prefer display_names for many concepts."""
+    return display_names([concept_id], conn=conn, offline=offline)[concept_id]
@@ -0,0 +1,189 @@
+"""
+Paper -> concept incidence store, parsed once from the `concepts` column.
+
+The paper tables hold the concepts of each paper as one string
+("https://openalex.org/C123|name|score;..."). build_incidence tokenizes that
+column once and keeps it in CSR form:
+
+- indptr[i]:indptr[i + 1] are the tokens of the i-th row of the CSV,
+- indices  : concept index of each token (int32), in the order of the column,
+- scores   : score of each token (float32, NaN when missing or not a number),
+
+together with interned tables: paper IDs, short concept IDs ('C123'), concept
+IDs as written in the column (usually full URLs) and the first name seen for
+each concept. Tokens without at least "id|name" are ignored.
+
+The arrays are saved as .npy files in <csv>.incidence/ and memory-mapped by
+load_incidence, which only re-parses the CSV when it has changed. Rows follow
+the CSV, so the i-th row of a DataFrame read from the same file (default
+RangeIndex) is row i of the store.
+"""
+import json
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+TOKEN_PATTERN = r"^([^|]+)\|([^|]*)(?:\|([^|]*))?"
+ARRAYS = ["indptr", "indices", "scores", "paper_ids", "concept_ids", "concept_links", "concept_names"]
+
+
+class Incidence(NamedTuple):
+    indptr: np.ndarray         # int64, n_papers + 1
+    indices: np.ndarray        # int32, one per token
+    scores: np.ndarray         # float32, one per token
+    paper_ids: np.ndarray      # str, one per row of the CSV
+    concept_ids: np.ndarray    # str, short IDs
+    concept_links: np.ndarray  # str, IDs as written in the column
+    concept_names: np.ndarray  # str
+
+
+def default_dir(csv_path):
+    return str(csv_path) + ".incidence"
+
+
+def _signature(csv_path):
+    st = os.stat(csv_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def parse_incidence(csv_path, column="concepts", id_column="paper_id") -> Incidence:
+    """Tokenizes the concept column of csv_path (vectorized, no Python loop per paper)."""
+    df = pd.read_csv(csv_path, usecols=[id_column, column], dtype=str, keep_default_na=False)
+    n_papers = len(df)
+
+    tokens = df[column].reset_index(drop=True).str.split(";").explode()
+    parsed = tokens.str.strip().str.extract(TOKEN_PATTERN).dropna(subset=[0, 1])
+    row = parsed.index.to_numpy(dtype=np.int64)
+
+    links = parsed[0]
+    codes, concept_ids = pd.factorize(links.str.split("/").str[-1])
+    _, first = np.unique(codes, return_index=True)
+
+    return Incidence(
+        indptr=np.concatenate([[0], np.cumsum(np.bincount(row, minlength=n_papers))]).astype(np.int64),
+        indices=codes.astype(np.int32),
+        scores=pd.to_numeric(parsed[2], errors="coerce").to_numpy(dtype=np.float32),
+        paper_ids=df[id_column].to_numpy(dtype=str),
+        concept_ids=np.asarray(concept_ids, dtype=str),
+        concept_links=links.to_numpy(dtype=str)[first],
+        concept_names=parsed[1].to_numpy(dtype=str)[first],
+    )
+
+
+def build_incidence(csv_path, out_dir=None, column="concepts", id_column="paper_id") -> Incidence:
+    """Parses csv_path and saves the store in out_dir (default: <csv>.incidence/)."""
+    out_dir = out_dir or default_dir(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    inc = parse_incidence(csv_path, column=column, id_column=id_column)
+    for name in ARRAYS:
+        tmp = os.path.join(out_dir, f"{name}.tmp.npy")
+        np.save(tmp, getattr(inc, name))
+        os.replace(tmp, os.path.join(out_dir, f"{name}.npy"))
+    meta = {"source": os.path.basename(csv_path), "signature": _signature(csv_path),
+            "column": column, "id_column": id_column}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return inc
+
+
+def load_incidence(csv_path, out_dir=None, column="concepts", id_column="paper_id",
+                   mmap=True) -> Incidence:
+    """
+    Store of csv_path, memory-mapped from out_dir; (re)built first if it is
+    missing or older than the CSV.
+    """
+    out_dir = out_dir or default_dir(csv_path)
+    meta_file = os.path.join(out_dir, "meta.json")
+    if os.path.exists(meta_file):
+        with open(meta_file, encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta["signature"] == _signature(csv_path)
+                and meta["column"] == column and meta["id_column"] == id_column):
+            mode = "r" if mmap else None
+            return Incidence(*(np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode=mode)
+                               for name in ARRAYS))
+    return build_incidence(csv_path, out_dir, column=column, id_column=id_column)
+
+
+def paper_rows(inc: Incidence, paper_ids) -> np.ndarray:
+    """Rows of the given papers (-1 if unknown); a duplicated paper ID maps to its last row."""
+    rows = pd.Series(np.arange(len(inc.paper_ids)), index=np.asarray(inc.paper_ids))
+    rows = rows[~rows.index.duplicated(keep="last")]
+    return rows.reindex(list(paper_ids)).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def concept_mask(inc: Incidence, concept_ids) -> np.ndarray:
+    """Boolean mask over the concepts of the store; IDs may be short or full URLs."""
+    wanted = {str(cid).split("/")[-1] for cid in concept_ids}
+    return np.isin(inc.concept_ids, list(wanted))
+
+
+def token_positions(inc: Incidence, rows):
+    """
+    (positions, owners) of the tokens of the given rows, in order: positions index
+    indices/scores, owners is the position of the row in `rows`.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = inc.indptr[rows]
+    lengths = inc.indptr[rows + 1] - starts
+    shift = starts - (np.cumsum(lengths) - lengths)
+    positions = np.arange(lengths.sum(), dtype=np.int64) + np.repeat(shift, lengths)
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    return positions, owners
+
+
+def incidence_matrix(inc: Incidence, rows=None, mask: Optional[np.ndarray] = None) -> sp.csr_matrix:
+    """
+    len(rows) x n_concepts matrix counting the occurrences of each concept in each
+    paper (all rows by default); concepts outside `mask` are dropped.
+    """
+    if rows is None:
+        rows = np.arange(len(inc.paper_ids))
+    positions, owners = token_positions(inc, rows)
+    concepts = inc.indices[positions]
+    if mask is not None:
+        keep = mask[concepts]
+        concepts, owners = concepts[keep], owners[keep]
+    return sp.csr_matrix((np.ones(len(concepts), dtype=np.int32), (owners, concepts)),
+                         shape=(len(rows), len(inc.concept_ids)))
+
+
+def add_papers_to_graph(G, inc: Incidence, rows, mask: Optional[np.ndarray] = None):
+    """
+    Adds to the networkx graph G the concepts of the given rows (only those in
+    `mask` if given) and links the concepts that appear in a same paper.
+
+    Nodes are added in order of first appearance, with the Concept_name and
+    Concept_link attributes; existing nodes are left untouched. As with the
+    former per-paper loops, a concept listed twice in a paper gets a self-loop.
+    Rows < 0 (unknown papers) are skipped.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    rows = rows[rows >= 0]
+    positions, owners = token_positions(inc, rows)
+    concepts = inc.indices[positions]
+    if mask is not None:
+        keep = mask[concepts]
+        concepts, owners = concepts[keep], owners[keep]
+
+    uniq, first = np.unique(concepts, return_index=True)
+    for c in uniq[np.argsort(first, kind="stable")]:
+        concept_id = str(inc.concept_ids[c])
+        if concept_id not in G:
+            G.add_node(concept_id, Concept_name=str(inc.concept_names[c]),
+                       Concept_link=str(inc.concept_links[c]))
+
+    counts = sp.csr_matrix((np.ones(len(concepts), dtype=np.int32), (owners, concepts)),
+                           shape=(len(rows), len(inc.concept_ids)))
+    counts.sum_duplicates()
+    present = counts.copy()
+    present.data[:] = 1
+    co = sp.triu(present.T @ present, k=1).tocoo()
+    ids = inc.concept_ids
+    G.add_edges_from(zip(ids[co.row].tolist(), ids[co.col].tolist()))
+
+    repeated = np.unique(counts.indices[counts.data > 1])
+    G.add_edges_from((str(ids[c]), str(ids[c])) for c in repeated)
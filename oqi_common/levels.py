@@ -0,0 +1,88 @@
+"""
+Concept levels as bitmasks, for vectorized level filters.
+
+concepts_levels.csv (concept_id, level) is loaded once into a sorted array of
+short concept IDs and one bitmask per concept, where bit l is set when the
+concept has level l. A concept listed with several levels keeps all of them,
+so a selection matches when any of its levels is selected, like the former
+set-of-IDs filters.
+
+A level selection (explicit levels and/or a min/max level) is itself a
+bitmask, and the concepts it keeps are `(bits & selection) != 0`. Aligned
+with the concepts of the incidence store (see incidence.py), that mask
+selects the columns of the paper x concept matrix directly, so sweeping
+level combinations costs one mask and one column slice each.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+MAX_LEVEL = 31
+
+
+class ConceptLevels(NamedTuple):
+    concept_ids: np.ndarray  # short IDs ('C123'), sorted, unique
+    bits: np.ndarray         # uint32, bit l set if the concept has level l
+
+
+def load_levels(csv_path="concepts_levels.csv") -> ConceptLevels:
+    df = pd.read_csv(csv_path, usecols=["concept_id", "level"]).dropna()
+    concept_ids = df["concept_id"].astype(str).str.strip().str.split("/").str[-1].to_numpy()
+    levels = df["level"].to_numpy(dtype=np.int64)
+    if len(levels) and (levels.min() < 0 or levels.max() > MAX_LEVEL):
+        raise ValueError(f"levels must be between 0 and {MAX_LEVEL}")
+
+    unique_ids, inverse = np.unique(concept_ids, return_inverse=True)
+    bits = np.zeros(len(unique_ids), dtype=np.uint32)
+    np.bitwise_or.at(bits, inverse, (np.uint32(1) << levels.astype(np.uint32)))
+    return ConceptLevels(unique_ids.astype(str), bits)
+
+
+def level_bits(levels=None, min_level=None, max_level=None) -> int:
+    """
+    Bitmask of a level selection: the given levels (ints or strings such as "4")
+    and/or the range min_level..max_level. No argument selects every level.
+    """
+    selection = 0
+    if levels is not None:
+        for level in levels:
+            selection |= 1 << int(level)
+    if min_level is not None or max_level is not None:
+        low = 0 if min_level is None else int(min_level)
+        high = MAX_LEVEL if max_level is None else int(max_level)
+        for level in range(low, high + 1):
+            selection |= 1 << level
+    if levels is None and min_level is None and max_level is None:
+        selection = (1 << (MAX_LEVEL + 1)) - 1
+    return selection
+
+
+def bits_for(concept_levels: ConceptLevels, concept_ids) -> np.ndarray:
+    """Bitmasks of the given concepts (short IDs or URLs); 0 for concepts without a level."""
+    wanted = np.asarray([str(cid).split("/")[-1] for cid in concept_ids], dtype=str)
+    known = concept_levels.concept_ids
+    if len(known) == 0:
+        return np.zeros(len(wanted), dtype=np.uint32)
+    pos = np.searchsorted(known, wanted)
+    pos[pos == len(known)] = 0
+    found = known[pos] == wanted
+    return np.where(found, concept_levels.bits[pos], 0).astype(np.uint32)
+
+
+def level_mask(bits, levels=None, min_level=None, max_level=None) -> np.ndarray:
+    """Boolean mask of the concepts having at least one selected level."""
+    selection = np.uint32(level_bits(levels, min_level, max_level))
+    return (np.asarray(bits, dtype=np.uint32) & selection) != 0
+
+
+def concept_ids_at_levels(concept_levels: ConceptLevels, levels=None, min_level=None,
+                          max_level=None) -> set:
+    """Set of short concept IDs having at least one selected level."""
+    mask = level_mask(concept_levels.bits, levels, min_level, max_level)
+    return set(concept_levels.concept_ids[mask].tolist())
+
+
+def incidence_level_bits(papers, csv_path="concepts_levels.csv") -> np.ndarray:
+    """Bitmasks aligned with the concepts of an incidence store (incidence.Incidence)."""
+    return bits_for(load_levels(csv_path), papers.concept_ids)
@@ -0,0 +1,202 @@
+"""
+Pair -> (period, score) index over the per-period Adamic-Adar score files.
+
+The scores of every period are loaded once into a SQLite table clustered on
+the canonical pair (concept1 < concept2, then period), so the whole history
+of a pair is a single index range scan instead of one full scan per period
+file. A second table records which periods were indexed, to tell a missing
+period apart from a pair without a score.
+
+The index is built in <db>.tmp and renamed when complete, so an interrupted
+build never leaves a partial index in place. A meta table records the
+(name, mtime, size) signature of the indexed files: open_pair_index rebuilds
+the index as soon as a file is added, rewritten, renamed or deleted.
+"""
+import json
+import os
+import re
+import glob
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pair_scores (
+    concept1 TEXT NOT NULL,
+    concept2 TEXT NOT NULL,
+    period   TEXT NOT NULL,
+    score    REAL,
+    PRIMARY KEY (concept1, concept2, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS periods (
+    period TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _canonical(concept1, concept2):
+    concept1 = np.asarray(concept1, dtype=object)
+    concept2 = np.asarray(concept2, dtype=object)
+    swapped = concept1 > concept2
+    return np.where(swapped, concept2, concept1), np.where(swapped, concept1, concept2)
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def add_period(conn, period, concept1, concept2, scores):
+    """Adds (or replaces) the scores of one period."""
+    first, second = _canonical(concept1, concept2)
+    period = str(period)
+    with conn:
+        conn.execute("DELETE FROM pair_scores WHERE period = ?", (period,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO pair_scores VALUES (?, ?, ?, ?)",
+            zip(first.tolist(), second.tolist(), [period] * len(first),
+                np.asarray(scores, dtype=float).tolist()),
+        )
+        conn.execute("INSERT OR IGNORE INTO periods VALUES (?)", (period,))
+
+
+def _signature(filenames):
+    signature = []
+    for filename in sorted(filenames):
+        st = os.stat(filename)
+        signature.append([os.path.basename(filename), st.st_mtime_ns, st.st_size])
+    return signature
+
+
+def score_files(csv_pattern, period_regex=r"(.+)_adamic_scores\.csv$"):
+    """{filename: period label} of the CSV files matching the glob and the regex."""
+    pattern = re.compile(period_regex)
+    files = {}
+    for filename in sorted(glob.glob(csv_pattern)):
+        match = pattern.search(os.path.basename(filename))
+        if match:
+            files[filename] = match.group(1)
+    return files
+
+
+def _build(db_path, fill, signature=None):
+    """Fills a new index in db_path + ".tmp", then renames it to db_path."""
+    tmp = db_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = connect(tmp)
+    fill(conn)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (json.dumps(signature),))
+    conn.close()
+    os.replace(tmp, db_path)
+    return connect(db_path)
+
+
+def build_pair_index(db_path, csv_pattern, period_regex=r"(.+)_adamic_scores\.csv$"):
+    """
+    Builds the index from per-period CSV files.
+
+    csv_pattern  : glob of the CSV files, e.g. "adamic_scores_by_year/*.csv"
+    period_regex : extracts the period label from the file name.
+    Both CSV layouts (Concept1/Concept2 and Concept1_ID/Concept2_ID) are accepted.
+    Raises FileNotFoundError if no file matches (e.g. wrong working directory).
+    """
+    files = score_files(csv_pattern, period_regex)
+    if not files:
+        raise FileNotFoundError(f"No score file matches {csv_pattern}")
+
+    def fill(conn):
+        for filename, period in files.items():
+            df = pd.read_csv(filename)
+            df = df.rename(columns={"Concept1_ID": "Concept1", "Concept2_ID": "Concept2"})
+            add_period(conn, period, df["Concept1"], df["Concept2"], df["AdamicAdarScore"])
+            print(f"Indexé : {filename} ({len(df):,} paires)")
+
+    return _build(db_path, fill, _signature(files))
+
+
+def index_signature(conn):
+    """Signature of the files the index was built from (None if unknown)."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def open_pair_index(db_path, csv_pattern, period_regex=r"(.+)_adamic_scores\.csv$"):
+    """
+    Opens the index of the CSV files, (re)built first if it is missing or if
+    the files differ from those it was built from.
+    """
+    files = score_files(csv_pattern, period_regex)
+    if os.path.exists(db_path) and files:
+        conn = connect(db_path)
+        if index_signature(conn) == _signature(files):
+            return conn
+        conn.close()
+    return build_pair_index(db_path, csv_pattern, period_regex)
+
+
+def build_pair_index_from_store(db_path, store_dir):
+    """Builds the index from the Parquet score store (see score_store.py)."""
+    from oqi_common import score_store
+
+    def fill(conn):
+        for period in score_store.list_periods(store_dir):
+            df = score_store.read_scores(store_dir, periods=period,
+                                         columns=score_store.PAIR_COLUMNS + [score_store.SCORE_COLUMN])
+            add_period(conn, period, df["Concept1"], df["Concept2"], df[score_store.SCORE_COLUMN])
+
+    return _build(db_path, fill)
+
+
+def indexed_periods(conn):
+    return [row[0] for row in conn.execute("SELECT period FROM periods ORDER BY period")]
+
+
+def pair_history(conn, concept_a, concept_b):
+    """{period: score} for one pair; the order of the two concepts does not matter."""
+    first, second = sorted((concept_a, concept_b))
+    rows = conn.execute(
+        "SELECT period, score FROM pair_scores WHERE concept1 = ? AND concept2 = ?",
+        (first, second),
+    )
+    return dict(rows)
+
+
+def pair_histories(conn, pairs):
+    """
+    {(concept_a, concept_b): {period: score}} for many pairs in a single query.
+
+    The requested pairs are loaded in a temporary table and joined against
+    the index, so the cost is one lookup per pair whatever their number.
+    Keys are returned as given by the caller.
+    """
+    pairs = list(pairs)
+    # a pair may be requested in both orders: every requested key gets its history
+    canonical = {}
+    for pair in pairs:
+        canonical.setdefault(tuple(sorted(pair)), []).append(pair)
+    histories = {pair: {} for pair in pairs}
+
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (concept1 TEXT, concept2 TEXT)")
+        conn.execute("DELETE FROM wanted")
+        conn.executemany("INSERT INTO wanted VALUES (?, ?)", canonical.keys())
+        rows = conn.execute(
+            "SELECT s.concept1, s.concept2, s.period, s.score "
+            "FROM wanted w JOIN pair_scores s "
+            "ON s.concept1 = w.concept1 AND s.concept2 = w.concept2"
+        ).fetchall()
+        conn.execute("DELETE FROM wanted")
+
+    for concept1, concept2, period, score in rows:
+        for pair in canonical[(concept1, concept2)]:
+            histories[pair][period] = score
+    return histories
@@ -0,0 +1,302 @@
+"""
+Pair x period matrix of scores, for analyses across all periods at once.
+
+Every per-period panel of the project (Jaccard season files, Adamic-Adar score
+files or store, yearly weights and citations of the edge panels) is a long
+table (concept1, concept2, period, value). PairPeriodMatrix holds it as:
+
+- concepts : sorted vocabulary of the concepts (str),
+- pairs    : int64 key first * len(concepts) + second of each row, with
+             first < second the codes of the canonical pair; sorted,
+- periods  : integer period ID of each column (see periods.py), sorted,
+- unit     : their granularity (periods.QUARTER, periods.YEAR, ...),
+- matrix   : float32 CSR matrix, len(pairs) x len(periods).
+
+A stored entry means the pair has a value in that period, even if it is 0;
+a missing entry is a missing value (NaN in a wide table), not a zero. The
+reductions below (mean, variance, window sums, growth) work on the CSR
+arrays directly and return one value per pair, so ranking all pairs is a
+single vectorized pass instead of a loop over a dict of pairs.
+
+save / load keep the arrays as .npy files, memory-mapped on load as in
+incidence.py; meta.json records the granularity and an optional signature
+of the source files, so that a saved matrix can serve as a cache.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from oqi_common import periods as period_ids
+
+ARRAYS = ["concepts", "pairs", "periods", "indptr", "indices", "data"]
+
+
+class PairPeriodMatrix(NamedTuple):
+    concepts: np.ndarray       # str, sorted
+    pairs: np.ndarray          # int64 pair key of each row, sorted
+    periods: np.ndarray        # int64 period ID of each column, sorted
+    unit: period_ids.Periods   # granularity of the period IDs
+    matrix: sp.csr_matrix      # float32, pairs x periods, stored entry = value present
+
+    def labels(self):
+        """Label of each column ("winter_2020", "2020", ...)."""
+        return [self.unit.label(p) for p in self.periods]
+
+    def pair_concepts(self, rows=None):
+        """(first, second) concepts of the given rows (all rows by default)."""
+        keys = self.pairs if rows is None else self.pairs[np.asarray(rows, dtype=np.int64)]
+        n = len(self.concepts)
+        return self.concepts[keys // n], self.concepts[keys % n]
+
+    def pair_rows(self, pairs):
+        """Rows of (concept_a, concept_b) tuples, in any order (-1 if unknown)."""
+        pairs = list(pairs)
+        if not pairs:
+            return np.empty(0, dtype=np.int64)
+        index = pd.Index(self.concepts)
+        a = index.get_indexer([p[0] for p in pairs]).astype(np.int64)
+        b = index.get_indexer([p[1] for p in pairs]).astype(np.int64)
+        keys = np.minimum(a, b) * len(self.concepts) + np.maximum(a, b)
+        rows = np.searchsorted(self.pairs, keys)
+        found = (a >= 0) & (b >= 0) & np.isin(keys, self.pairs)
+        return np.where(found, rows, -1)
+
+
+def from_long(concept1, concept2, period, values, unit=period_ids.QUARTER,
+              periods=None) -> PairPeriodMatrix:
+    """
+    Pivots a long table into a PairPeriodMatrix in one pass.
+
+    concept1, concept2 : concepts of each row, in any order inside a pair
+    period             : period ID of each row (in `unit`)
+    periods            : period IDs of the columns, e.g. a full period_range
+                         including periods without any value; rows in other
+                         periods are dropped. Default: the periods present.
+
+    A pair listed several times in a period (e.g. in both directions) keeps
+    its last value, as the former dict-of-dicts did.
+    """
+    concept1 = np.asarray(concept1, dtype=object)
+    n_rows = len(concept1)
+    codes, concepts = pd.factorize(np.concatenate([concept1, np.asarray(concept2, dtype=object)]),
+                                   sort=True)
+    a, b = codes[:n_rows].astype(np.int64), codes[n_rows:].astype(np.int64)
+    keys = np.minimum(a, b) * len(concepts) + np.maximum(a, b)
+    return _from_keys(np.asarray(concepts, dtype=str), keys, np.asarray(period, dtype=np.int64),
+                      np.asarray(values, dtype=np.float32), unit, periods)
+
+
+def _from_keys(concepts, keys, period, values, unit, periods=None) -> PairPeriodMatrix:
+    if periods is None:
+        periods = np.unique(period)
+    periods = np.asarray(periods, dtype=np.int64)
+    keep = np.isin(period, periods)
+    keys, col, values = keys[keep], np.searchsorted(periods, period[keep]), values[keep]
+
+    # last value of each (pair, period)
+    cell = keys * len(periods) + col
+    _, last = np.unique(cell[::-1], return_index=True)
+    last = len(cell) - 1 - last
+    keys, col, values = keys[last], col[last], values[last]
+
+    pairs, row = np.unique(keys, return_inverse=True)
+    matrix = sp.csr_matrix((values, (row, col)), shape=(len(pairs), len(periods)), dtype=np.float32)
+    matrix.sort_indices()
+    return PairPeriodMatrix(concepts, pairs, periods, unit, matrix)
+
+
+def _read_score_file(period, path, score_column):
+    df = pd.read_csv(path).rename(columns={"Concept1_ID": "Concept1", "Concept2_ID": "Concept2"})
+    return pd.DataFrame({"Concept1": df["Concept1"].to_numpy(dtype=object),
+                         "Concept2": df["Concept2"].to_numpy(dtype=object),
+                         "period": np.full(len(df), period, dtype=np.int64),
+                         "score": df[score_column].to_numpy(dtype=np.float32)})
+
+
+def read_score_files(files, score_column, unit=period_ids.QUARTER, periods=None,
+                     workers=None) -> PairPeriodMatrix:
+    """
+    Matrix of the per-period score files.
+
+    files        : {period ID: CSV path}, with Concept1, Concept2 (or Concept1_ID,
+                   Concept2_ID) and the score column
+    score_column : e.g. "JaccardScore" or "AdamicAdarScore"
+    workers      : threads reading the files concurrently (the CSV parser releases
+                   the GIL); None uses the default of ThreadPoolExecutor, 1 reads
+                   them one after the other
+
+    The files are concatenated into one long table with a period column,
+    then canonicalized and pivoted once (from_long).
+    """
+    items = list(files.items())
+    if workers == 1:
+        frames = [_read_score_file(period, path, score_column) for period, path in items]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(lambda item: _read_score_file(*item, score_column), items))
+    long = pd.concat(frames, ignore_index=True)
+    return from_long(long["Concept1"], long["Concept2"], long["period"], long["score"], unit, periods)
+
+
+def files_signature(files):
+    """[name, mtime, size] of each file: changes as soon as one is rewritten, added or removed."""
+    signature = []
+    for path in sorted(str(f) for f in files):
+        st = os.stat(path)
+        signature.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+    return signature
+
+
+def read_score_store(store_dir, unit=period_ids.YEAR, periods=None) -> PairPeriodMatrix:
+    """Matrix of the Adamic-Adar scores of a Parquet score store (score_store.py)."""
+    from oqi_common import score_store
+
+    df = score_store.read_scores(store_dir, columns=score_store.PAIR_COLUMNS + [score_store.SCORE_COLUMN])
+    labels = df["period"].astype(str)
+    period = labels.map({label: unit.parse_label(label) for label in labels.unique()})
+    df, period = df[period.notna()], period.dropna()
+    return from_long(df["Concept1"], df["Concept2"], period.to_numpy(dtype=np.int64),
+                     df[score_store.SCORE_COLUMN], unit, periods)
+
+
+def from_edges(edges: pd.DataFrame, concepts, column="weight", periods=None) -> PairPeriodMatrix:
+    """
+    Matrix of one column of an edge panel (edge_panel.py): rows are its
+    canonical pairs, columns its years (YEAR IDs), every calendar year between
+    the first and the last by default. The concept codes and pair keys of the
+    panel are kept as they are.
+    """
+    year = edges["year"].to_numpy(dtype=np.int64)
+    if periods is None and len(year):
+        periods = period_ids.YEAR.period_range(year.min(), year.max())
+    return _from_keys(np.asarray(concepts, dtype=str), edges["pair"].to_numpy(dtype=np.int64), year,
+                      edges[column].to_numpy(dtype=np.float32), period_ids.YEAR, periods)
+
+
+# -------------------------------------------------------------------
+# reductions: one value per pair
+# -------------------------------------------------------------------
+def counts(m: PairPeriodMatrix) -> np.ndarray:
+    """Number of periods in which each pair has a value."""
+    return np.diff(m.matrix.indptr)
+
+
+def _row_sums(m: PairPeriodMatrix, squared=False) -> np.ndarray:
+    data = m.matrix.data.astype(np.float64)
+    if squared:
+        data = data * data
+    sums = np.zeros(len(m.pairs))
+    present = counts(m) > 0
+    sums[present] = np.add.reduceat(data, m.matrix.indptr[:-1][present])
+    return sums
+
+
+def mean(m: PairPeriodMatrix, missing_as_zero=False) -> np.ndarray:
+    """
+    Average value of each pair over the periods where it has one (like a
+    DataFrame mean skipping NaN), or over all periods if missing_as_zero.
+    """
+    n = np.full(len(m.pairs), len(m.periods)) if missing_as_zero else counts(m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _row_sums(m) / n
+
+
+def variance(m: PairPeriodMatrix, ddof=1, missing_as_zero=False) -> np.ndarray:
+    """Variance of each pair (ddof=1 as pandas), NaN with fewer than ddof + 1 values."""
+    n = np.full(len(m.pairs), len(m.periods)) if missing_as_zero else counts(m)
+    sums, squares = _row_sums(m), _row_sums(m, squared=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (squares - sums * sums / n) / (n - ddof)
+    var[n <= ddof] = np.nan
+    return np.maximum(var, 0)
+
+
+def window_sum(m: PairPeriodMatrix, first, stop) -> np.ndarray:
+    """Sum of each pair over the period IDs [first, stop) (missing values count as 0)."""
+    start, end = np.searchsorted(m.periods, [first, stop])
+    if end <= start:
+        return np.zeros(len(m.pairs))
+    return np.asarray(m.matrix[:, start:end].sum(axis=1, dtype=np.float64)).ravel()
+
+
+def growth(m: PairPeriodMatrix, delta=3, latest=None, smoothing=1.0) -> np.ndarray:
+    """
+    (last + smoothing) / (prev + smoothing), with last the sum over the `delta`
+    periods ending at `latest` (default: the last column) and prev the sum over
+    the `delta` periods before, as in growth_metrics.py.
+    """
+    if latest is None:
+        latest = int(m.periods[-1])
+    last = window_sum(m, latest - delta + 1, latest + 1)
+    prev = window_sum(m, latest - 2 * delta + 1, latest - delta + 1)
+    return (last + smoothing) / (prev + smoothing)
+
+
+def top_rows(values, n) -> np.ndarray:
+    """Rows of the n largest values, in decreasing order (NaN last)."""
+    values = np.asarray(values, dtype=np.float64)
+    order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+    return order[:n]
+
+
+def to_frame(m: PairPeriodMatrix, rows=None) -> pd.DataFrame:
+    """
+    Wide table Concept1, Concept2, Concepts, one column per period label (NaN
+    where missing) for the given rows; only meant for a few rows (plots).
+    """
+    rows = np.arange(len(m.pairs)) if rows is None else np.asarray(rows, dtype=np.int64)
+    first, second = m.pair_concepts(rows)
+    sub = m.matrix[rows]
+    values = np.full(sub.shape, np.nan)
+    coo = sub.tocoo()
+    values[coo.row, coo.col] = coo.data
+    frame = pd.DataFrame(values, columns=m.labels(), index=rows)
+    frame.insert(0, "Concepts", [f"{a} & {b}" for a, b in zip(first, second)])
+    frame.insert(0, "Concept2", second)
+    frame.insert(0, "Concept1", first)
+    return frame
+
+
+# -------------------------------------------------------------------
+# saving / memory-mapped loading
+# -------------------------------------------------------------------
+def save(m: PairPeriodMatrix, out_dir, signature=None):
+    """Writes the arrays as .npy files (each one atomically) and meta.json last."""
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {"concepts": np.asarray(m.concepts, dtype=str), "pairs": m.pairs, "periods": m.periods,
+              "indptr": m.matrix.indptr, "indices": m.matrix.indices, "data": m.matrix.data}
+    meta_file = os.path.join(out_dir, "meta.json")
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+    for name in ARRAYS:
+        tmp = os.path.join(out_dir, f"{name}.tmp.npy")
+        np.save(tmp, arrays[name])
+        os.replace(tmp, os.path.join(out_dir, f"{name}.npy"))
+    meta = {"months": m.unit.months, "window": m.unit.window, "signature": signature}
+    with open(meta_file, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def load(out_dir, signature=None, mmap=True) -> Optional[PairPeriodMatrix]:
+    """
+    Matrix saved in out_dir, memory-mapped (read-only) by default; None if
+    there is none or if signature is given and differs from the saved one.
+    """
+    meta_file = os.path.join(out_dir, "meta.json")
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, encoding="utf-8") as f:
+        meta = json.load(f)
+    if signature is not None and meta["signature"] != signature:
+        return None
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+    matrix = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                           shape=(len(arrays["pairs"]), len(arrays["periods"])), copy=False)
+    return PairPeriodMatrix(arrays["concepts"], arrays["pairs"], arrays["periods"],
+                            period_ids.Periods(meta["months"], meta["window"]), matrix)
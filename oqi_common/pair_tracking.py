@@ -0,0 +1,168 @@
+"""
+Single-pass tracking of concept pairs across per-period score files.
+
+Each period is read once, by chunks. Only two things are kept:
+
+- the scores of the tracked pairs (one float per tracked pair and period),
+- the set of pairs of the period as a sorted array of 64-bit pair hashes.
+
+The added / removed / common counts between consecutive periods then come
+from a sorted merge of two hash arrays instead of set operations on tuples,
+so memory stays at 8 bytes per pair of the current and previous periods
+whatever the number of tracked pairs.
+
+When the periods come with delta files (period_scoring.score_sliding_periods
+with deltas_dir), track_deltas reads the first period in full and then only
+the deltas: the tracked scores are updated from the changed pairs and the
+counts come straight from the added / removed rows.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+PeriodSummary = namedtuple(
+    "PeriodSummary",
+    ["period", "tracked_scores", "n_pairs", "added", "removed", "common", "has_previous"],
+)
+
+_COLUMN_ALIASES = {"Concept1_ID": "Concept1", "Concept2_ID": "Concept2"}
+
+
+def pair_hashes(concept1, concept2):
+    """Order-insensitive 64-bit hash of each (concept1, concept2) pair."""
+    concept1 = np.asarray(concept1, dtype=object)
+    concept2 = np.asarray(concept2, dtype=object)
+    swapped = concept1 > concept2
+    frame = pd.DataFrame({
+        "first": np.where(swapped, concept2, concept1),
+        "second": np.where(swapped, concept1, concept2),
+    })
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def csv_chunks(filename, chunksize=500_000):
+    """Yields (concept1, concept2, score) arrays from a score CSV, chunk by chunk."""
+    header = pd.read_csv(filename, nrows=0).rename(columns=_COLUMN_ALIASES)
+    names = list(header.columns)
+    for chunk in pd.read_csv(filename, chunksize=chunksize, header=0, names=names,
+                             usecols=["Concept1", "Concept2", "AdamicAdarScore"]):
+        yield (chunk["Concept1"].to_numpy(), chunk["Concept2"].to_numpy(),
+               chunk["AdamicAdarScore"].to_numpy(dtype=np.float64))
+
+
+def store_chunks(store_dir, period):
+    """Yields (concept1, concept2, score) arrays of one period of the Parquet store, batch by batch."""
+    from oqi_common import score_store
+    import pyarrow.dataset as ds
+
+    dataset = score_store.open_store(store_dir)
+    scanner = dataset.scanner(
+        columns=score_store.PAIR_COLUMNS + [score_store.SCORE_COLUMN],
+        filter=ds.field("period") == str(period),
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        yield (df["Concept1"].to_numpy(dtype=object), df["Concept2"].to_numpy(dtype=object),
+               df[score_store.SCORE_COLUMN].to_numpy(dtype=np.float64))
+
+
+def track_periods(periods, tracked_pairs):
+    """
+    Streams over the periods and yields one PeriodSummary per period.
+
+    periods       : iterable of (label, chunks) where chunks yields
+                    (concept1, concept2, score) arrays (see csv_chunks / store_chunks)
+    tracked_pairs : list of (concept_a, concept_b); tracked_scores follows this
+                    order, with NaN when the pair is absent from the period.
+    """
+    tracked_pairs = list(tracked_pairs)
+    if tracked_pairs:
+        tracked_keys = pair_hashes(*zip(*tracked_pairs))
+    else:
+        tracked_keys = np.empty(0, dtype=np.uint64)
+    order = np.argsort(tracked_keys)
+    sorted_keys = tracked_keys[order]
+
+    previous = None
+    for label, chunks in periods:
+        tracked_scores = np.full(len(tracked_pairs), np.nan)
+        keys = []
+        for concept1, concept2, scores in chunks:
+            chunk_keys = pair_hashes(concept1, concept2)
+            keys.append(chunk_keys)
+
+            if len(sorted_keys):
+                pos = np.searchsorted(sorted_keys, chunk_keys)
+                pos[pos == len(sorted_keys)] = 0
+                match = sorted_keys[pos] == chunk_keys
+                tracked_scores[order[pos[match]]] = scores[match]
+
+        current = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.uint64)
+
+        if previous is not None:
+            common = np.intersect1d(previous, current, assume_unique=True).size
+            added, removed = current.size - common, previous.size - common
+        else:
+            common = added = removed = 0
+
+        yield PeriodSummary(label, tracked_scores, current.size, added, removed, common,
+                            previous is not None and previous.size > 0)
+        previous = current
+
+
+def delta_chunks(filename, chunksize=500_000):
+    """Yields (concept1, concept2, previous, score) arrays from a delta CSV, chunk by chunk (NaN = absent)."""
+    for chunk in pd.read_csv(filename, chunksize=chunksize,
+                             usecols=["Concept1", "Concept2", "PreviousScore", "AdamicAdarScore"]):
+        yield (chunk["Concept1"].to_numpy(), chunk["Concept2"].to_numpy(),
+               chunk["PreviousScore"].to_numpy(dtype=np.float64),
+               chunk["AdamicAdarScore"].to_numpy(dtype=np.float64))
+
+
+def track_deltas(first, deltas, tracked_pairs):
+    """
+    Same PeriodSummary stream as track_periods, from one full period and the
+    deltas of the following ones.
+
+    first  : (label, chunks) of the first period, as for track_periods
+    deltas : iterable of (label, chunks) of the next periods, in order, where
+             chunks yields (concept1, concept2, previous, score) arrays (see delta_chunks)
+
+    The counts match track_periods on the score files when those files list
+    exactly the scored pairs of the deltas (written with min_score > 0).
+    """
+    summaries = track_periods([first], tracked_pairs)
+    summary = next(summaries)
+    yield summary
+
+    tracked_pairs = list(tracked_pairs)
+    if tracked_pairs:
+        tracked_keys = pair_hashes(*zip(*tracked_pairs))
+    else:
+        tracked_keys = np.empty(0, dtype=np.uint64)
+    order = np.argsort(tracked_keys)
+    sorted_keys = tracked_keys[order]
+
+    tracked_scores = summary.tracked_scores.copy()
+    n_pairs = summary.n_pairs
+    for label, chunks in deltas:
+        added = removed = 0
+        for concept1, concept2, previous, scores in chunks:
+            added += int(np.isnan(previous).sum())
+            removed += int(np.isnan(scores).sum())
+
+            if len(sorted_keys):
+                chunk_keys = pair_hashes(concept1, concept2)
+                pos = np.searchsorted(sorted_keys, chunk_keys)
+                pos[pos == len(sorted_keys)] = 0
+                match = sorted_keys[pos] == chunk_keys
+                tracked_scores[order[pos[match]]] = scores[match]
+
+        common = n_pairs - removed
+        yield PeriodSummary(label, tracked_scores.copy(), n_pairs + added - removed, added, removed,
+                            common, n_pairs > 0)
+        n_pairs += added - removed
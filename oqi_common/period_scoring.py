@@ -0,0 +1,172 @@
+"""
+Per-period Adamic-Adar scoring, sequentially or in a pool of processes.
+
+A period job is (label, rows, output_path): rows are the rows of the
+incidence store (see incidence.py) whose papers make up the cumulative graph
+of the period. Once those rows are known the periods are independent, so
+they can be scored on several cores:
+
+- workers memory-map the incidence store read-only (load_incidence), so the
+  paper table is neither re-parsed nor copied into each process;
+- each worker writes its period CSV (and Parquet partition) itself, to a
+  temporary file renamed into place, so an interrupted run never leaves a
+  half-written period file;
+- results come back in job order.
+
+Sliding windows (see periods.py) can instead be scored with
+score_sliding_periods: one process moves a single SlidingConceptGraph
+(sliding_graph.py) from window to window, adding the entering papers and
+removing the leaving ones, rather than rebuilding each window. The same
+driver, with cumulative jobs, can also write a delta file per period: the
+pairs added, removed or changed since the previous period (write_delta_csv).
+
+The pool only imports oqi_common, but with the "spawn" start method
+(Windows) the calling script must still start it from an
+`if __name__ == "__main__":` block.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from oqi_common import incidence
+from oqi_common.adamic_sparse import adamic_adar_index_sparse
+from oqi_common.sliding_graph import SlidingConceptGraph
+
+# stores already memory-mapped in this process
+_PAPERS = {}
+
+
+def _papers(csv_path):
+    if csv_path not in _PAPERS:
+        _PAPERS[csv_path] = incidence.load_incidence(csv_path)
+    return _PAPERS[csv_path]
+
+
+def period_graph(papers, rows, mask=None):
+    """Concept co-occurrence graph of the given rows of an incidence store."""
+    G = nx.Graph()
+    incidence.add_papers_to_graph(G, papers, rows, mask)
+    return G
+
+
+def write_scores_csv(output_path, G, adamic_preds, with_names=False):
+    """
+    Writes the scores of a period atomically: Concept1, Concept2, AdamicAdarScore,
+    or Concept1_ID, Concept1_Name, Concept2_ID, Concept2_Name, AdamicAdarScore
+    when with_names is True.
+    """
+    tmp = output_path + ".tmp"
+    with open(tmp, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if with_names:
+            writer.writerow(["Concept1_ID", "Concept1_Name", "Concept2_ID", "Concept2_Name",
+                             "AdamicAdarScore"])
+            for u, v, score in adamic_preds:
+                writer.writerow([u, G.nodes[u].get('Concept_name', 'Unknown'),
+                                 v, G.nodes[v].get('Concept_name', 'Unknown'), score])
+        else:
+            writer.writerow(["Concept1", "Concept2", "AdamicAdarScore"])
+            for u, v, score in adamic_preds:
+                writer.writerow([u, v, score])
+    os.replace(tmp, output_path)
+
+
+def write_scores_to_store(store_dir, period, G, adamic_preds):
+    """Writes the scores of a period to the Parquet store, with the concept names."""
+    from oqi_common import score_store
+
+    if not adamic_preds:
+        return
+    us, vs, scores = zip(*adamic_preds)
+    score_store.write_period_scores(
+        store_dir, period, us, vs, scores,
+        [G.nodes[u].get('Concept_name', u) for u in us],
+        [G.nodes[v].get('Concept_name', v) for v in vs],
+    )
+
+
+def write_delta_csv(output_path, papers, first, second, previous, score):
+    """
+    Writes the difference with the previous period atomically: Concept1, Concept2,
+    Change (added / removed / changed), PreviousScore, AdamicAdarScore, where a
+    missing score is empty.
+    """
+    ids = np.asarray(papers.concept_ids)
+    change = np.where(np.isnan(previous), "added", np.where(np.isnan(score), "removed", "changed"))
+    tmp = output_path + ".tmp"
+    pd.DataFrame({
+        "Concept1": ids[first], "Concept2": ids[second], "Change": change,
+        "PreviousScore": previous, "AdamicAdarScore": score,
+    }).to_csv(tmp, index=False)
+    os.replace(tmp, output_path)
+
+
+def score_period(csv_path, label, rows, output_path, mask=None, with_names=False,
+                 top_k=None, min_score=None, store_dir=None):
+    """Builds, scores and writes one period; returns (label, n_concepts, n_pairs)."""
+    G = period_graph(_papers(csv_path), rows, mask)
+    adamic_preds = adamic_adar_index_sparse(G, top_k=top_k, min_score=min_score)
+    write_scores_csv(output_path, G, adamic_preds, with_names)
+    if store_dir:
+        write_scores_to_store(store_dir, label, G, adamic_preds)
+    return label, G.number_of_nodes(), len(adamic_preds)
+
+
+def score_periods(csv_path, jobs, workers=1, **options):
+    """
+    Runs score_period for every (label, rows, output_path) job and yields the
+    results in job order.
+
+    workers : number of processes; 1 scores in the current process, None uses
+              every core.
+    options : mask, with_names, top_k, min_score, store_dir (see score_period).
+    """
+    # the store is built once here, before the workers memory-map it
+    incidence.load_incidence(csv_path)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for label, rows, output_path in jobs:
+            yield score_period(csv_path, label, rows, output_path, **options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(score_period, csv_path, label, rows, output_path, **options)
+                   for label, rows, output_path in jobs]
+        for future in futures:
+            yield future.result()
+
+
+def score_sliding_periods(csv_path, jobs, mask=None, with_names=False, top_k=None, min_score=None,
+                          store_dir=None, deltas_dir=None):
+    """
+    Same jobs and results as score_periods, for windows that also lose papers:
+    the graph is updated from one job's rows to the next instead of being rebuilt.
+    Sequential, since every window starts from the previous one. Pairs are
+    written in the order of the concepts of the incidence store.
+
+    deltas_dir : if given, <label>_adamic_delta.csv is also written there for
+                 every job: the scored pairs (score > 0, >= min_score if given)
+                 added, removed or changed since the previous job, the first job
+                 being compared with an empty graph.
+    """
+    papers = _papers(csv_path)
+    window = SlidingConceptGraph(papers, mask)
+    if deltas_dir:
+        os.makedirs(deltas_dir, exist_ok=True)
+    for label, rows, output_path in jobs:
+        window.set_papers(rows)
+        if deltas_dir:
+            write_delta_csv(os.path.join(deltas_dir, f"{label}_adamic_delta.csv"), papers,
+                            *window.score_delta(min_score))
+        G = window.graph()
+        adamic_preds = window.adamic_adar_index(top_k=top_k, min_score=min_score)
+        write_scores_csv(output_path, G, adamic_preds, with_names)
+        if store_dir:
+            write_scores_to_store(store_dir, label, G, adamic_preds)
+        yield label, G.number_of_nodes(), len(adamic_preds)
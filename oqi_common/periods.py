@@ -0,0 +1,110 @@
+"""
+Integer period IDs of any granularity, computed from publication dates.
+
+A granularity is a number of months per period: 1 (MONTH), 3 (QUARTER, the
+former seasons), 12 (YEAR) or any other length. The period of a date is
+
+    (year * 12 + month - 1) // months
+
+so consecutive periods have consecutive IDs and a whole date column is
+assigned with a few vectorized operations, without building labels first.
+Labels are only made for file names and plots:
+
+- QUARTER : "winter_2020", "spring_2020", "summer_2020", "fall_2020", as written
+            by get_season_label (winter = January-March, ...),
+- YEAR    : "2020",
+- others  : "2020-01", the first month of the period.
+
+A snapshot is the set of papers a period's graph is built from: every paper
+published up to the end of the period (cumulative, the default), or only the
+papers of the last `window` periods, e.g. Periods(1, window=6) for six-month
+windows sliding by one month. A snapshot is labelled by its last period.
+"""
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+SEASONS = ["winter", "spring", "summer", "fall"]
+SEASON_PATTERN = re.compile(r"^(winter|spring|summer|fall)_(\d{4})$", re.IGNORECASE)
+MONTH_PATTERN = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+class Periods(NamedTuple):
+    months: int                    # length of a period in months
+    window: Optional[int] = None   # periods per snapshot, None = cumulative
+
+    def ids(self, dates) -> np.ndarray:
+        """Period ID of each date (datetime-like Series or array, without NaT)."""
+        dates = pd.DatetimeIndex(dates)
+        return (dates.year.to_numpy(dtype=np.int64) * 12 + dates.month.to_numpy(dtype=np.int64) - 1) // self.months
+
+    def start_month(self, period_id):
+        """(year, month) of the first month of a period."""
+        index = int(period_id) * self.months
+        return index // 12, index % 12 + 1
+
+    def label(self, period_id) -> str:
+        if self.months == 3:
+            return f"{SEASONS[int(period_id) % 4]}_{int(period_id) // 4}"
+        if self.months == 12:
+            return str(int(period_id))
+        year, month = self.start_month(period_id)
+        return f"{year}-{month:02d}"
+
+    def parse_label(self, label) -> Optional[int]:
+        """Period ID of a label written by label(), None if it is not one."""
+        label = str(label)
+        if self.months == 3:
+            match = SEASON_PATTERN.match(label)
+            if match:
+                return int(match.group(2)) * 4 + SEASONS.index(match.group(1).lower())
+            return None
+        if self.months == 12:
+            return int(label) if label.isdigit() else None
+        match = MONTH_PATTERN.match(label)
+        if match:
+            return (int(match.group(1)) * 12 + int(match.group(2)) - 1) // self.months
+        return None
+
+    def period_range(self, first, last):
+        """IDs of the periods first..last (both included)."""
+        return np.arange(int(first), int(last) + 1, dtype=np.int64)
+
+
+MONTH = Periods(1)
+QUARTER = Periods(3)
+YEAR = Periods(12)
+
+
+def year_start(periods: Periods, year) -> int:
+    """ID of the period that contains January of `year`."""
+    return (int(year) * 12) // periods.months
+
+
+def snapshot_papers(paper_ids, dates, periods: Periods = QUARTER):
+    """
+    Yields (period_id, papers) for every period in which at least one paper was
+    published, in chronological order. papers are the sorted unique paper IDs
+    of the snapshot: published up to the end of the period, or within its last
+    periods.window periods. A paper listed with several dates belongs to each
+    of them (cumulatively: from its first one).
+    """
+    paper_ids = np.asarray(paper_ids)
+    period_ids = periods.ids(dates)
+    unique_ids, inverse = np.unique(paper_ids, return_inverse=True)
+    present = np.unique(period_ids)
+
+    if periods.window is None:
+        first = np.full(len(unique_ids), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, inverse, period_ids)
+        for period_id in present:
+            yield int(period_id), unique_ids[first <= period_id]
+        return
+
+    for period_id in present:
+        in_window = (period_ids > period_id - periods.window) & (period_ids <= period_id)
+        keep = np.zeros(len(unique_ids), dtype=bool)
+        keep[inverse[in_window]] = True
+        yield int(period_id), unique_ids[keep]
@@ -0,0 +1,176 @@
+"""
+Columnar store for per-period Adamic-Adar scores.
+
+All periods live in one Hive-partitioned Parquet dataset:
+
+    <store_dir>/period=<label>/part-0.parquet
+
+with the columns Concept1, Concept2 (dictionary-encoded, Concept1 < Concept2),
+AdamicAdarScore (float32) and, when known, Concept1_Name / Concept2_Name.
+Rows are sorted by (Concept1, Concept2) so that pair lookups can skip row
+groups from their statistics, and period filters only open the matching
+partitions.
+
+pyarrow is only needed for this store; the CSV outputs work without it.
+"""
+import os
+import re
+import glob
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = ds = pq = None
+
+
+SCORE_COLUMN = "AdamicAdarScore"
+PAIR_COLUMNS = ["Concept1", "Concept2"]
+NAME_COLUMNS = ["Concept1_Name", "Concept2_Name"]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The score store needs pyarrow: pip install pyarrow")
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("period", pa.string())]), flavor="hive")
+
+
+def canonical_pairs(concept1, concept2):
+    """Orders each pair so that concept1 < concept2. Returns (first, second, swapped)."""
+    concept1 = np.asarray(concept1, dtype=object)
+    concept2 = np.asarray(concept2, dtype=object)
+    swapped = concept1 > concept2
+    first = np.where(swapped, concept2, concept1)
+    second = np.where(swapped, concept1, concept2)
+    return first, second, swapped
+
+
+def write_period_scores(store_dir, period, concept1, concept2, scores, names1=None, names2=None):
+    """
+    Writes (or replaces) the partition of one period.
+
+    The file is written next to its final location and renamed, so readers
+    never see a half-written partition.
+    """
+    _require_pyarrow()
+    first, second, swapped = canonical_pairs(concept1, concept2)
+    table = {
+        "Concept1": first,
+        "Concept2": second,
+        SCORE_COLUMN: np.asarray(scores, dtype=np.float32),
+    }
+    if names1 is not None and names2 is not None:
+        names1 = np.asarray(names1, dtype=object)
+        names2 = np.asarray(names2, dtype=object)
+        table["Concept1_Name"] = np.where(swapped, names2, names1)
+        table["Concept2_Name"] = np.where(swapped, names1, names2)
+
+    df = pd.DataFrame(table).sort_values(PAIR_COLUMNS, kind="stable")
+    # Explicit types so that empty periods do not infer a null schema for the whole dataset
+    arrays = {
+        col: pa.array(df[col].to_numpy(), type=pa.string()).dictionary_encode() if col != SCORE_COLUMN
+        else pa.array(df[col].to_numpy(), type=pa.float32())
+        for col in df.columns
+    }
+
+    partition_dir = os.path.join(store_dir, f"period={period}")
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, "part-0.parquet")
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.table(arrays), tmp_path, row_group_size=64 * 1024)
+    os.replace(tmp_path, path)
+    return path
+
+
+def import_csv_scores(csv_pattern, store_dir, period_regex=r"(.+)_adamic_scores\.csv$"):
+    """
+    Converts existing per-period CSV files into the store.
+
+    csv_pattern  : glob of the CSV files, e.g. "adamic_scores_by_year/*.csv"
+    period_regex : extracts the period label from the file name.
+    Both CSV layouts (Concept1/Concept2 and Concept1_ID/Concept1_Name/...) are accepted.
+    """
+    pattern = re.compile(period_regex)
+    periods = []
+    for filename in sorted(glob.glob(csv_pattern)):
+        match = pattern.search(os.path.basename(filename))
+        if not match:
+            continue
+        df = pd.read_csv(filename, dtype={SCORE_COLUMN: np.float32})
+        df = df.rename(columns={"Concept1_ID": "Concept1", "Concept2_ID": "Concept2"})
+        has_names = all(col in df.columns for col in NAME_COLUMNS)
+        write_period_scores(
+            store_dir, match.group(1),
+            df["Concept1"].to_numpy(), df["Concept2"].to_numpy(), df[SCORE_COLUMN].to_numpy(),
+            df["Concept1_Name"].to_numpy() if has_names else None,
+            df["Concept2_Name"].to_numpy() if has_names else None,
+        )
+        periods.append(match.group(1))
+    return periods
+
+
+def open_store(store_dir):
+    _require_pyarrow()
+    return ds.dataset(store_dir, format="parquet", partitioning=_partitioning())
+
+
+def list_periods(store_dir):
+    """Period labels present in the store, sorted as strings."""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name.split("=", 1)[1] for name in os.listdir(store_dir) if name.startswith("period=")
+    )
+
+
+def read_scores(store_dir, periods=None, pairs=None, min_score=None, columns=None):
+    """
+    Reads scores from the store, pushing every filter down to the Parquet scan.
+
+    periods   : label or list of labels (None = all periods)
+    pairs     : iterable of (concept_a, concept_b); order inside a pair does not matter
+    min_score : keep only rows with AdamicAdarScore >= min_score
+    columns   : columns to read (the period column is always added)
+    """
+    dataset = open_store(store_dir)
+    expr = None
+
+    def _and(current, other):
+        return other if current is None else current & other
+
+    if periods is not None:
+        if isinstance(periods, str):
+            periods = [periods]
+        expr = _and(expr, ds.field("period").isin([str(p) for p in periods]))
+    if min_score is not None:
+        expr = _and(expr, ds.field(SCORE_COLUMN) >= min_score)
+
+    wanted = None
+    if pairs is not None:
+        pairs = list(pairs)
+        first, second, _ = canonical_pairs(*zip(*pairs)) if pairs else ([], [], None)
+        wanted = set(zip(first, second))
+        expr = _and(expr, ds.field("Concept1").isin(sorted(set(first))))
+        expr = _and(expr, ds.field("Concept2").isin(sorted(set(second))))
+
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + (PAIR_COLUMNS if wanted is not None else []) + ["period"]))
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+    if wanted is not None and len(df):
+        keep = [pair in wanted for pair in zip(df["Concept1"], df["Concept2"])]
+        df = df[keep]
+    return df.reset_index(drop=True)
+
+
+def top_scores(store_dir, period, top_n):
+    """The top_n rows of one period by decreasing score."""
+    df = read_scores(store_dir, periods=period)
+    return df.nlargest(top_n, SCORE_COLUMN).reset_index(drop=True)
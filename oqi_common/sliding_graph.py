@@ -0,0 +1,222 @@
+"""
+Concept co-occurrence graph over a sliding window of papers, updated in place.
+
+The cumulative generators only ever add papers. In a sliding window the
+papers of the oldest period also leave the graph, so edges are kept as
+counters over the concepts of the incidence store (see incidence.py):
+
+- C[i, j] (i != j): number of papers of the window in which i and j co-occur,
+  C[i, i]: number of papers of the window that contain i (the node exists
+  while it is > 0),
+- loops[i]: number of papers that list i twice (self-loop, as in
+  add_papers_to_graph).
+
+A step adds P_in^T P_in and subtracts P_out^T P_out, with P the binary paper
+x concept matrices of the entering and leaving papers. An edge appears or
+disappears where a counter crosses zero. Only the endpoints Z of those edges
+change degree, and an Adamic-Adar score S[u, v] = sum_z A[u, z] A[z, v] / log d(z)
+can only change if u or v is a neighbour (before or after) of a node of Z or
+in Z itself. Only those rows (and the matching columns) of S are recomputed,
+so a step costs the neighbourhood of the change instead of a full A W A
+product. When a hub changes degree most rows are affected anyway, and S is
+then recomputed in one product (FULL_RECOMPUTE_FRACTION). The counters and
+the adjacency are plain sparse matrices, updated with sparse additions.
+
+The scores are exact (rows are recomputed, not patched), and equal those of
+a graph rebuilt from the papers of the window.
+
+Since every score that can change lies in a recomputed row, the difference
+between two consecutive graphs (score_delta) is read from those rows only:
+pairs that gained a score, lost it (became an edge, or lost their last
+common neighbour) or whose score changed. It covers the scored pairs, i.e.
+the non-edges with a positive score (>= min_score when given).
+"""
+from typing import Optional
+
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+
+from oqi_common import incidence
+from oqi_common.adamic_sparse import adamic_adar_matrix, adamic_adar_non_edges, inverse_log_degree
+
+# above this fraction of affected rows, S is recomputed in one product rather than merged
+FULL_RECOMPUTE_FRACTION = 0.5
+
+
+def _values_at(M, rows, cols):
+    if len(rows) == 0:
+        return np.zeros(0)
+    return np.asarray(M[rows, cols]).ravel()
+
+
+def _scored_pairs(adjacency, scores, rows, n, min_score=None):
+    """
+    (sorted keys first * n + second, scores) of the non-edges with a positive score
+    (>= min_score) that have an endpoint in `rows`.
+    """
+    S = scores[rows]
+    S = (S - S.multiply(adjacency[rows] != 0)).tocoo()
+    first, second = rows[S.row], S.col.astype(np.int64)
+    keep = (first != second) & (S.data > 0)
+    if min_score is not None:
+        keep &= S.data >= min_score
+    first, second, values = first[keep], second[keep], S.data[keep]
+    keys = np.minimum(first, second) * n + np.maximum(first, second)
+    keys, index = np.unique(keys, return_index=True)
+    return keys, values[index]
+
+
+class SlidingConceptGraph:
+
+    def __init__(self, papers: incidence.Incidence, mask: Optional[np.ndarray] = None):
+        self.papers = papers
+        self.mask = mask
+        n = len(papers.concept_ids)
+        self.n = n
+        self.counts = sp.csr_matrix((n, n), dtype=np.int64)
+        self.loops = np.zeros(n, dtype=np.int64)
+        self.adjacency = sp.csr_matrix((n, n), dtype=np.float64)
+        self.degrees = np.zeros(n)
+        self.scores = sp.csr_matrix((n, n), dtype=np.float64)
+        # papers of the window, as rows of the incidence store
+        self.rows = np.empty(0, dtype=np.int64)
+        # state before the last update, and rows whose scores it may have changed
+        self.previous = (self.adjacency, self.scores)
+        self.touched = np.empty(0, dtype=np.int64)
+
+    def _paper_matrices(self, rows):
+        """(binary paper x concept matrix, number of papers listing each concept twice)."""
+        M = incidence.incidence_matrix(self.papers, rows, self.mask)
+        M.sum_duplicates()
+        repeated = np.bincount(M.indices[M.data > 1], minlength=self.n)
+        M.data[:] = 1
+        return M, repeated
+
+    def nodes(self) -> np.ndarray:
+        """Concept indices (in the incidence store) of the nodes of the graph."""
+        return np.flatnonzero(self.counts.diagonal() > 0)
+
+    def set_papers(self, rows):
+        """Moves the window to the given rows; returns the number of (entering, leaving) papers."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        rows = rows[rows >= 0]
+        entering = np.setdiff1d(rows, self.rows, assume_unique=True)
+        leaving = np.setdiff1d(self.rows, rows, assume_unique=True)
+        self.update(entering, leaving)
+        self.rows = rows
+        return len(entering), len(leaving)
+
+    def update(self, entering, leaving):
+        """
+        Adds the papers at rows `entering` and removes those at `leaving`, then
+        recomputes the Adamic-Adar rows of the nodes around the changed edges.
+        Returns the concept indices whose scores were recomputed.
+        """
+        self.previous = (self.adjacency, self.scores)
+        self.touched = np.empty(0, dtype=np.int64)
+        M_in, rep_in = self._paper_matrices(entering)
+        M_out, rep_out = self._paper_matrices(leaving)
+        delta = (M_in.T @ M_in - M_out.T @ M_out).tocoo()
+
+        old_counts = self.counts
+        self.counts = (old_counts + delta.tocsr()).tocsr()
+        self.counts.eliminate_zeros()
+        old_loops = self.loops
+        self.loops = old_loops + rep_in - rep_out
+
+        # edges whose counter crossed zero (off-diagonal) and changed self-loops
+        off = delta.row != delta.col
+        r, c = delta.row[off], delta.col[off]
+        before = _values_at(old_counts, r, c) != 0
+        after = _values_at(self.counts, r, c) != 0
+        flipped = before != after
+        loop_flipped = np.flatnonzero((old_loops > 0) != (self.loops > 0))
+        changed = np.unique(np.concatenate([r[flipped], c[flipped], loop_flipped]))
+        if len(changed) == 0:
+            return changed
+
+        old_adjacency = self.adjacency
+        offdiag = sp.triu(self.counts, k=1)
+        offdiag = offdiag + offdiag.T
+        self.adjacency = (sp.csr_matrix(offdiag != 0, dtype=np.float64)
+                          + sp.diags((self.loops > 0).astype(np.float64))).tocsr()
+        self.adjacency.eliminate_zeros()
+        self.degrees = np.asarray(self.adjacency.sum(axis=1)).ravel() + self.adjacency.diagonal()
+
+        # rows of S that can change: the changed nodes and their old and new neighbours
+        affected = np.zeros(self.n, dtype=bool)
+        affected[changed] = True
+        affected[old_adjacency[changed].indices] = True
+        affected[self.adjacency[changed].indices] = True
+        rows = np.flatnonzero(affected)
+        if len(rows) > FULL_RECOMPUTE_FRACTION * len(self.nodes()):
+            self.scores = adamic_adar_matrix(self.adjacency, self.degrees)
+        else:
+            self._recompute_rows(rows, affected)
+        self.touched = rows
+        return rows
+
+    def _recompute_rows(self, rows, in_rows):
+        W = sp.diags(inverse_log_degree(self.degrees))
+        fresh = (self.adjacency[rows] @ W @ self.adjacency).tocoo()
+        fresh_rows = rows[fresh.row]
+        mirror = ~in_rows[fresh.col]   # S[v, u] for v outside the recomputed rows
+
+        old = self.scores.tocoo()
+        keep = ~in_rows[old.row] & ~in_rows[old.col]
+        self.scores = sp.csr_matrix(
+            (np.concatenate([old.data[keep], fresh.data, fresh.data[mirror]]),
+             (np.concatenate([old.row[keep], fresh_rows, fresh.col[mirror]]),
+              np.concatenate([old.col[keep], fresh.col, fresh_rows[mirror]]))),
+            shape=(self.n, self.n))
+        self.scores.eliminate_zeros()
+
+    def score_delta(self, min_score=None):
+        """
+        Scored pairs that differ between the graph before and after the last
+        update, as (first, second, previous, score) arrays: concept indices
+        first < second, previous = NaN for an added pair, score = NaN for a
+        removed one.
+        """
+        rows = self.touched
+        keys_old, old = _scored_pairs(*self.previous, rows, self.n, min_score)
+        keys_new, new = _scored_pairs(self.adjacency, self.scores, rows, self.n, min_score)
+
+        keys = np.union1d(keys_old, keys_new)
+        previous = np.full(len(keys), np.nan)
+        score = np.full(len(keys), np.nan)
+        previous[np.searchsorted(keys, keys_old)] = old
+        score[np.searchsorted(keys, keys_new)] = new
+        both = ~np.isnan(previous) & ~np.isnan(score)
+        differ = ~both | ~np.isclose(previous, score, rtol=1e-9, atol=0.0)
+        keys, previous, score = keys[differ], previous[differ], score[differ]
+        return keys // self.n, keys % self.n, previous, score
+
+    def non_edges(self, top_k=None, min_score=None):
+        """
+        (nodes, rows, cols, scores) of the non-connected pairs of the current
+        graph, as adamic_adar_non_edges would give them for the rebuilt graph;
+        rows and cols index `nodes` (concept indices, in store order).
+        """
+        nodes = self.nodes()
+        A = self.adjacency[nodes][:, nodes]
+        S = self.scores[nodes][:, nodes]
+        rows, cols, scores = adamic_adar_non_edges(A, self.degrees[nodes], top_k=top_k,
+                                                   min_score=min_score, S=S)
+        return nodes, rows, cols, scores
+
+    def graph(self):
+        """networkx graph of the current nodes (with Concept_name / Concept_link), without edges."""
+        G = nx.Graph()
+        ids = self.papers.concept_ids
+        G.add_nodes_from((str(ids[c]), {"Concept_name": str(self.papers.concept_names[c]),
+                                        "Concept_link": str(self.papers.concept_links[c])})
+                         for c in self.nodes())
+        return G
+
+    def adamic_adar_index(self, top_k=None, min_score=None):
+        """Same (u, v, score) list as adamic_adar_index_sparse on the rebuilt graph."""
+        nodes, rows, cols, scores = self.non_edges(top_k=top_k, min_score=min_score)
+        ids = np.asarray(self.papers.concept_ids, dtype=object)[nodes]
+        return list(zip([str(u) for u in ids[rows]], [str(v) for v in ids[cols]], scores.tolist()))